@@ -9,46 +9,74 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import time
-import chess  # type: ignore
 
-from .protocol import EventType, parse_payload, format_capture_reply, format_engine_move
+from .protocol import (
+    EventType,
+    SIDE_NAME,
+    TURN_MSG,
+    parse_payload,
+    format_capture_reply,
+    format_engine_move,
+)
 from .stockfish_opponent import StockfishOpponent
+from piChessBackend import Board, is_game_over_fast, parse_uci_cached
 
 
 @dataclass
 class LoopDeps:
-    link: "BoardLink"      # from piSerial
-    display: "Display"     # from piDisplay
+    link: "BoardLink"  # from piSerial
+    display: "Display"  # from piDisplay
     opponent: StockfishOpponent
 
 
 class GameController:
     def __init__(self, deps: LoopDeps, *, human_is_white: bool = True):
         self.deps = deps
-        self.board = chess.Board()
+        self.board = Board()
         self.human_is_white = human_is_white
+        # Refreshed by _after_push(); they only change when a move is pushed,
+        # so the loop does not re-derive them for every Pico message.
+        self.engine_to_move = False
+        self.game_over = False
+        # Position key (chess.Board._transposition_key) for the legality
+        # and engine caches; also refreshed by _after_push().
+        self.zkey = self.board._transposition_key()
 
     def _human_to_move(self) -> bool:
-        if self.board.turn == chess.WHITE:
-            return self.human_is_white
-        return not self.human_is_white
+        # chess.WHITE/BLACK are True/False, so one comparison settles it
+        return self.board.turn == self.human_is_white
+
+    def _after_push(self, game_over: bool) -> None:
+        self.engine_to_move = not self._human_to_move()
+        self.game_over = game_over
+        self.zkey = self.board._transposition_key()
 
     def _send_turn_prompt(self) -> None:
-        side = "white" if self.board.turn == chess.WHITE else "black"
-        self.deps.link.sendtoboard(f"turn_{side}")
+        self.deps.link.sendtoboard(TURN_MSG[self.board.turn])
 
     def _drain_nonblocking(self) -> None:
-        # Drain a few events per tick so typing previews remain responsive.
-        for _ in range(6):
-            payload = self.deps.link.getboard_nonblocking()
-            if payload is None:
-                return
+        # Handle everything already queued. A run of typing previews only
+        # draws its newest frame; capture queries are still answered one by one.
+        preview = None
+        for payload in self.deps.link.drain_nonblocking():
             evt = parse_payload(payload)
+            if evt.type == EventType.TYPING:
+                preview = evt.payload
+                continue
+            if preview is not None and evt.type != EventType.CAPTURE_QUERY:
+                self._handle_event(EventType.TYPING, preview, nonblocking=True)
+                preview = None
             self._handle_event(evt.type, evt.payload, nonblocking=True)
+        if preview is not None:
+            self._handle_event(EventType.TYPING, preview, nonblocking=True)
 
     def play_stockfish(self, *, move_time_ms: int) -> None:
         self.deps.opponent.set_time_ms(move_time_ms)
-        self.board = chess.Board()
+        self.board.reset()
+        from piGame import reset_game_caches
+
+        reset_game_caches()
+        self._after_push(False)
         self.deps.link.sendtoboard("GameStart")
 
         if not self.human_is_white:
@@ -62,22 +90,28 @@ class GameController:
         while True:
             self._drain_nonblocking()
 
-            if not self.board.is_game_over() and not self._human_to_move():
+            if self.engine_to_move and not self.game_over:
                 self.deps.display.send("Engine Thinking...")
                 self._engine_step()
                 continue
 
-            payload = self.deps.link.getboard()
-            if payload is None:
+            # A throttled preview may still be parked: sleep only until it
+            # is due, so the last frame of a typing burst is still drawn.
+            due = self.deps.display.flush_pending()
+            if due is not None and not self.deps.link.wait_readable(due):
                 continue
+            payload = self.deps.link.getboard(block=True)
             evt = parse_payload(payload)
             self._handle_event(evt.type, evt.payload)
 
-    def _handle_event(self, typ: EventType, payload: str, nonblocking: bool = False) -> None:
+    def _handle_event(
+        self, typ: EventType, payload: str, nonblocking: bool = False
+    ) -> None:
         from piGame import GoToModeSelect  # keep exception class stable
 
         if typ == EventType.SHUTDOWN:
             from piGame import shutdown_pi
+
             shutdown_pi(self.deps.link, self.deps.display)
             raise GoToModeSelect()
 
@@ -86,59 +120,108 @@ class GameController:
 
         if typ == EventType.TYPING:
             from piGame import handle_typing_preview
-            handle_typing_preview(self.deps.display, payload)
+
+            # The player types during their own turn: same 50 ms throttle
+            # as the other loops; play_stockfish flushes the parked frame.
+            handle_typing_preview(self.deps.display, payload, throttle=True)
             return
 
         if typ == EventType.OK:
             # OK is used as an acknowledgement / "enter move" trigger from the Pico UI.
             # It should NEVER be treated as a move payload.
-            side = "WHITE" if self.board.turn == chess.WHITE else "BLACK"
-            self.deps.display.prompt_move(side)
+            self.deps.display.prompt_move(SIDE_NAME[self.board.turn])
             return
 
-
         if typ == EventType.CAPTURE_QUERY:
             from piGame import compute_capture_preview
-            try:
-                cap = compute_capture_preview(self.board, payload)
-            except Exception:
-                cap = False
+
+            cap = compute_capture_preview(self.board, payload)
             self.deps.link.sendtoboard(format_capture_reply(cap))
             return
 
         if typ == EventType.HINT:
             from piGame import send_hint_to_board, RuntimeState, GameConfig
-            state = RuntimeState(board=self.board, mode="stockfish")
-            cfg = GameConfig(skill_level=5, move_time_ms=int(self.deps.opponent.move_time_ms), human_is_white=self.human_is_white)
-            send_hint_to_board(self.deps.link, self.deps.display, self.deps.opponent.ctx, state, cfg)
+
+            state = RuntimeState(board=self.board, mode="stockfish", zkey=self.zkey)
+            cfg = GameConfig(
+                skill_level=5,
+                move_time_ms=int(self.deps.opponent.move_time_ms),
+                human_is_white=self.human_is_white,
+            )
+            send_hint_to_board(
+                self.deps.link, self.deps.display, self.deps.opponent.ctx, state, cfg
+            )
             return
 
         if typ == EventType.MOVE:
             from piGame import process_human_move
-            process_human_move(link=self.deps.link, display=self.deps.display, board=self.board, uci=payload)
+
+            game_over = process_human_move(
+                link=self.deps.link,
+                display=self.deps.display,
+                board=self.board,
+                uci=payload,
+                ctx=self.deps.opponent.ctx,
+                zkey=self.zkey,
+            )
+            if game_over is not None:
+                self._after_push(game_over)
             return
 
         # Unknown messages: ignore in nonblocking mode, else show as invalid
         if not nonblocking:
             from piGame import parse_move_payload
+
             if not parse_move_payload(payload):
                 self.deps.link.sendtoboard(f"error_invalid_{payload}")
                 self.deps.display.show_invalid(payload)
 
     def _engine_step(self) -> None:
-        uci = self.deps.opponent.get_move(self.board)
+        from piGame import cached_engine_move, search_while_serving
+
+        opp = self.deps.opponent
+        # A position already answered at these settings skips Stockfish.
+        # Otherwise search on the engine thread; previews and capture probes
+        # are answered meanwhile, anything else is replayed by the main loop.
+        key = (
+            self.zkey,
+            opp.skill_level,
+            opp.use_elo,
+            opp.move_time_ms,
+        )
+        uci = cached_engine_move(
+            opp.ctx,
+            key,
+            search_while_serving,
+            self.deps.link,
+            self.deps.display,
+            self.board,
+            opp.get_move,
+            self.board,
+        )
         if not uci:
             return
-        mv = chess.Move.from_uci(uci)
+        mv = parse_uci_cached(uci)
         is_cap = self.board.is_capture(mv)
         self.deps.link.sendtoboard(format_engine_move(uci, is_cap))
         self.board.push(mv)
+        self._after_push(is_game_over_fast(self.board))
+
+        from piGame import report_game_over, handoff_next_turn
 
-        from piGame import report_game_over, handoff_next_turn, GameConfig
-        if self.board.is_game_over():
-            report_game_over(self.deps.link, self.deps.display, self.board)
+        if self.game_over:
+            report_game_over(
+                self.deps.link, self.deps.display, self.board, self.deps.opponent.ctx
+            )
             return
 
-        # Preserve OLED arrow/status behavior
-        dummy_cfg = GameConfig(skill_level=5, move_time_ms=int(self.deps.opponent.move_time_ms), human_is_white=self.human_is_white)
-        handoff_next_turn(self.deps.link, self.deps.display, self.board, "stockfish", dummy_cfg, uci)
+        # Preserve OLED arrow/status behavior; the engine just moved, so it is the human's turn.
+        handoff_next_turn(
+            self.deps.link,
+            self.deps.display,
+            self.board,
+            "stockfish",
+            None,
+            uci,
+            engine_to_move=False,
+        )
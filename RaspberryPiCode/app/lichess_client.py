@@ -5,20 +5,27 @@ Token via env var LICHESS_TOKEN.
 """
 from __future__ import annotations
 
-import os, json
+import os
 from typing import Dict, Any, Iterator, Optional
 import requests
 from requests.exceptions import RequestException
 
+# Optional C JSON parser for the event streams; both loads() accept bytes.
+try:
+    import orjson as _json  # type: ignore
+except ImportError:
+    import json as _json
+
 LICHESS_BASE = "https://lichess.org"
 
 
 def _iter_ndjson(resp) -> Iterator[Dict[str, Any]]:
-    for line in resp.iter_lines(decode_unicode=True):
+    # Raw bytes lines: the parser decodes them itself, no str round-trip
+    for line in resp.iter_lines():
         if not line:
             continue
         try:
-            yield json.loads(line)
+            yield _json.loads(line)
         except Exception:
             continue
 
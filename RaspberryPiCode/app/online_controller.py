@@ -13,8 +13,25 @@ from typing import Callable, Optional
 import time
 import chess  # type: ignore
 
+from piChessBackend import parse_uci_cached, uci_squares
 from .lichess_client import LichessClient
 from .lichess_game import extract_moves, extract_players, extract_status, extract_winner
+from .protocol import (
+    SIDE_NAME,
+    TK_DRAW,
+    TK_HINT,
+    TK_NEW,
+    TK_OK,
+    TK_SHUTDOWN,
+    TOKEN_KIND,
+    TURN_MSG,
+)
+
+# Lichess 'winner' field -> PGN result; no winner means a draw
+_RESULT_BY_WINNER = {"white": "1-0", "black": "0-1"}
+
+# Promotion rank per colour, indexed by chess.Color (BLACK=False, WHITE=True)
+_PROMO_RANK = (chess.BB_RANK_1, chess.BB_RANK_8)
 
 
 @dataclass
@@ -44,8 +61,7 @@ class OnlineController:
         display = self.d.display
 
         # Handshake with Pico
-        link.sendtoboard("SetupComplete")
-        link.sendtoboard("GameStart")
+        link.sendtoboard_many(["SetupComplete", "GameStart"])
 
         acct = self.client.get_account()
         if acct.get("_error"):
@@ -98,9 +114,7 @@ class OnlineController:
             """
             if board.turn != your_color:
                 return
-            link.sendtoboard(
-                "turn_white" if board.turn == chess.WHITE else "turn_black"
-            )
+            link.sendtoboard(TURN_MSG[board.turn])
 
         # Flags controlling OLED overwrites
         awaiting_ok_ack = False  # True after opponent move until user starts input
@@ -112,7 +126,7 @@ class OnlineController:
             nonlocal last_move_count, awaiting_ok_ack, in_move_entry
             for uci in move_list[last_move_count:]:
                 try:
-                    mv = chess.Move.from_uci(uci)
+                    mv = parse_uci_cached(uci)
                 except Exception:
                     last_move_count += 1
                     continue
@@ -130,7 +144,7 @@ class OnlineController:
                 send_turn_if_human()
 
                 if announce_new:
-                    side_to_move = "WHITE" if board.turn == chess.WHITE else "BLACK"
+                    side_to_move = SIDE_NAME[board.turn]
                     display.send(f"{uci_to_oled(uci)}\n{side_to_move} to move")
 
                     # Hold this message until OK is pressed and user starts input
@@ -172,25 +186,12 @@ class OnlineController:
             # --- Non blocking handling (buttons from Pico) ---
             peek = link.getboard_nonblocking()
             if peek:
-                if peek == "shutdown":
+                kind = TOKEN_KIND.get(peek, 0)
+                if kind == TK_SHUTDOWN:
                     self.d.shutdown_pi(link, display)
                     return
 
-                if peek.startswith("typing_"):
-                    # As soon as typing starts, we are in move entry => never show prompt_move this turn
-                    awaiting_ok_ack = False
-                    in_move_entry = True
-                    self.d.handle_typing_preview(display, peek[7:])
-
-                if peek.startswith("capq_"):
-                    uciq = peek[5:].strip()
-                    try:
-                        cap = self.d.compute_capture_preview(board, uciq)
-                    except Exception:
-                        cap = False
-                    link.sendtoboard(f"capr_{1 if cap else 0}")
-
-                if peek in ("n", "new", "in", "newgame", "btn_new"):
+                elif kind == TK_NEW:
                     display.send("Resigning...")
                     try:
                         self.client.resign_game(game_id)
@@ -198,16 +199,27 @@ class OnlineController:
                         pass
                     raise self.d.GoToModeSelect()
 
-                if peek in ("draw", "btn_draw"):
+                elif kind == TK_DRAW:
                     display.send("Offering draw...")
                     try:
                         self.client.offer_draw(game_id)
                     except Exception:
                         pass
 
-                if peek in ("hint", "btn_hint"):
+                elif kind == TK_HINT:
                     display.send("Online mode\nHints disabled")
 
+                elif peek.startswith("typing_"):
+                    # As soon as typing starts, we are in move entry => never show prompt_move this turn
+                    awaiting_ok_ack = False
+                    in_move_entry = True
+                    self.d.handle_typing_preview(display, peek[7:])
+
+                elif peek.startswith("capq_"):
+                    uciq = peek[5:].strip()
+                    cap = self.d.compute_capture_preview(board, uciq)
+                    link.sendtoboard(f"capr_{1 if cap else 0}")
+
             if board.is_game_over():
                 self.d.report_game_over(link, display, board)
                 raise self.d.GoToModeSelect()
@@ -230,15 +242,15 @@ class OnlineController:
 
                         status = extract_status(payload)
                         if status and status != "started":
-                            winner = extract_winner(payload)
-                            result = "1/2-1/2"
-                            if winner == "white":
-                                result = "1-0"
-                            elif winner == "black":
-                                result = "0-1"
+                            result = _RESULT_BY_WINNER.get(
+                                extract_winner(payload), "1/2-1/2"
+                            )
 
                             link.sendtoboard(f"GameOver:{result}")
-                            display.send(f"GAME OVER\nResult {result}\nStart new game?")
+                            display.send(
+                                f"GAME OVER\nResult {result}\nStart new game?",
+                                sticky=True,
+                            )
                             raise self.d.GoToModeSelect()
 
                 except StopIteration:
@@ -265,7 +277,7 @@ class OnlineController:
                 and (not awaiting_ok_ack)
                 and (not in_move_entry)
             ):
-                side = "WHITE" if your_color == chess.WHITE else "BLACK"
+                side = SIDE_NAME[your_color]
                 display.prompt_move(side)
                 prompted_for_this_turn = True
 
@@ -273,26 +285,12 @@ class OnlineController:
             if not msg:
                 continue
 
-            if msg == "shutdown":
+            kind = TOKEN_KIND.get(msg, 0)
+            if kind == TK_SHUTDOWN:
                 self.d.shutdown_pi(link, display)
                 return
 
-            if msg.startswith("typing_"):
-                awaiting_ok_ack = False
-                in_move_entry = True
-                self.d.handle_typing_preview(display, msg[7:])
-                continue
-
-            if msg.startswith("capq_"):
-                uciq = msg[5:].strip()
-                try:
-                    cap = self.d.compute_capture_preview(board, uciq)
-                except Exception:
-                    cap = False
-                link.sendtoboard(f"capr_{1 if cap else 0}")
-                continue
-
-            if msg in ("n", "new", "in", "newgame", "btn_new"):
+            if kind == TK_NEW:
                 display.send("Resigning...")
                 try:
                     self.client.resign_game(game_id)
@@ -300,7 +298,7 @@ class OnlineController:
                     pass
                 raise self.d.GoToModeSelect()
 
-            if msg in ("draw", "btn_draw"):
+            if kind == TK_DRAW:
                 display.send("Offering draw...")
                 try:
                     self.client.offer_draw(game_id)
@@ -308,20 +306,33 @@ class OnlineController:
                     pass
                 continue
 
-            if msg in ("hint", "btn_hint"):
+            if kind == TK_HINT:
                 display.send("Online mode\nHints disabled")
                 continue
 
-            if msg in ("ok", "btnok", "btn_ok"):
+            if kind == TK_OK:
                 # OK is used as an acknowledgement / 'enter move' trigger.
                 # Do not treat it as a move payload.
                 awaiting_ok_ack = False
                 in_move_entry = False
-                side = "WHITE" if your_color == chess.WHITE else "BLACK"
+                side = SIDE_NAME[your_color]
                 display.prompt_move(side)
                 prompted_for_this_turn = True
                 continue
 
+            # Only non-token payloads get here: prefixed messages, then moves
+            if msg.startswith("typing_"):
+                awaiting_ok_ack = False
+                in_move_entry = True
+                self.d.handle_typing_preview(display, msg[7:])
+                continue
+
+            if msg.startswith("capq_"):
+                uciq = msg[5:].strip()
+                cap = self.d.compute_capture_preview(board, uciq)
+                link.sendtoboard(f"capr_{1 if cap else 0}")
+                continue
+
             # Any move payload means we are in move entry
             awaiting_ok_ack = False
             in_move_entry = True
@@ -333,27 +344,24 @@ class OnlineController:
                 continue
 
             # Promotion check
-            if len(uci) == 4:
-                try:
-                    piece = board.piece_at(chess.parse_square(uci[:2]))
-                    if piece and piece.piece_type == chess.PAWN:
-                        rank = int(uci[3])
-                        if (piece.color == chess.WHITE and rank == 8) or (
-                            piece.color == chess.BLACK and rank == 1
-                        ):
-                            promo = self.d.ask_promotion_piece(link, display)
-                            uci += promo
-                except Exception:
-                    pass
+            squares = uci_squares(uci) if len(uci) == 4 else None
+            if squares is not None:
+                from_bb = chess.BB_SQUARES[squares[0]]
+                if board.pawns & from_bb:
+                    # Pawn of either colour landing on its own last rank
+                    white = bool(board.occupied_co[chess.WHITE] & from_bb)
+                    if chess.BB_SQUARES[squares[1]] & _PROMO_RANK[white]:
+                        promo = self.d.ask_promotion_piece(link, display)
+                        uci += promo
 
             try:
-                move = chess.Move.from_uci(uci)
+                move = parse_uci_cached(uci)
             except ValueError:
                 link.sendtoboard(f"error_invalid_{uci}")
                 display.show_invalid(uci)
                 continue
 
-            if move not in board.legal_moves:
+            if not board.is_legal(move):
                 link.sendtoboard(f"error_illegal_{uci}")
                 display.show_illegal(uci, self.d.side_name_from_board(board))
                 continue
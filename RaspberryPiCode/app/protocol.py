@@ -11,6 +11,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from enum import Enum
+import re
 from typing import Optional
 
 
@@ -34,6 +35,20 @@ class Event:
 NEW_GAME_TOKENS = {"n", "new", "in", "newgame", "btn_new"}
 HINT_TOKENS = {"hint", "btn_hint"}
 OK_TOKENS = {"ok", "btnok", "btn_ok"}
+DRAW_TOKENS = {"draw", "btn_draw"}
+
+# Control tokens resolved with one dict hit per message; anything that is
+# not a key here is a prefixed message (typing_/capq_) or a move.
+TK_NEW, TK_HINT, TK_OK, TK_SHUTDOWN, TK_DRAW = 1, 2, 3, 4, 5
+TOKEN_KIND = {
+    **dict.fromkeys(NEW_GAME_TOKENS, TK_NEW),
+    **dict.fromkeys(HINT_TOKENS, TK_HINT),
+    **dict.fromkeys(OK_TOKENS, TK_OK),
+    **dict.fromkeys(DRAW_TOKENS, TK_DRAW),
+    "shutdown": TK_SHUTDOWN,
+}
+# Same table keyed by the raw payload bytes from BoardLink.getboard_bytes()
+TOKEN_KIND_B = {k.encode("ascii"): v for k, v in TOKEN_KIND.items()}
 
 
 def parse_payload(payload: str) -> Event:
@@ -53,33 +68,57 @@ def parse_payload(payload: str) -> Event:
         return Event(EventType.OK, low)
 
     if low.startswith("typing_"):
-        return Event(EventType.TYPING, low[len("typing_"):])
+        return Event(EventType.TYPING, low[len("typing_") :])
 
     if low.startswith("capq_"):
-        return Event(EventType.CAPTURE_QUERY, low[len("capq_"):].strip())
+        return Event(EventType.CAPTURE_QUERY, low[len("capq_") :].strip())
 
-    move = _parse_uci_like(low)
+    move = parse_uci_like(low)
     if move:
         return Event(EventType.MOVE, move)
 
     return Event(EventType.UNKNOWN, p)
 
 
-RESERVED_NON_MOVES = NEW_GAME_TOKENS | HINT_TOKENS | OK_TOKENS | {"draw", "btn_draw"}
+# Indexed by chess.Color (BLACK=False=0, WHITE=True=1)
+SIDE_NAME = ("BLACK", "WHITE")
+TURN_MSG = ("turn_black", "turn_white")
 
 
-def _parse_uci_like(s: str) -> Optional[str]:
-    s = (s or "").strip().lower()
+RESERVED_NON_MOVES = NEW_GAME_TOKENS | HINT_TOKENS | OK_TOKENS | DRAW_TOKENS
+
+
+# Whole message is a move: optional 'm' prefix, optional promotion letter.
+_MOVE_MSG_RE = re.compile(r"\s*m?\s*([a-h][1-8][a-h][1-8][qrbn]?)\s*")
+_UCI_RE = re.compile(r"[a-h][1-8][a-h][1-8][qrbn]?")
+# Deletes every ASCII char outside [a-z0-9] in one C-level pass. Anything
+# non-ASCII that survives can never satisfy _UCI_RE anyway.
+_NON_ALNUM_DEL = str.maketrans(
+    "",
+    "",
+    "".join(
+        chr(i) for i in range(128) if not (chr(i).isdigit() or "a" <= chr(i) <= "z")
+    ),
+)
+
+
+def parse_uci_like(s: str) -> Optional[str]:
+    """
+    Extract a UCI move from a Pico payload, or None. Control tokens
+    (RESERVED_NON_MOVES) can never match the move pattern.
+    """
     if not s:
         return None
-    if s.startswith("m"):
-        s = s[1:].strip()
-    cleaned = "".join(ch for ch in s if ch.isalnum())
-    if 4 <= len(cleaned) <= 5 and cleaned.isalnum():
-        if cleaned in RESERVED_NON_MOVES:
-            return None
-        return cleaned
-    return None
+    low = s.lower()
+    m = _MOVE_MSG_RE.fullmatch(low)
+    if m:
+        return m.group(1)
+    # Tolerate stray separators ("e2-e4"): strip them and try once more.
+    p = low.strip()
+    if p.startswith("m"):
+        p = p[1:]
+    cleaned = p.translate(_NON_ALNUM_DEL)
+    return cleaned if _UCI_RE.fullmatch(cleaned) else None
 
 
 def format_engine_move(uci: str, is_capture: bool) -> str:
@@ -91,4 +130,4 @@ def format_hint(uci: str, is_capture: bool) -> str:
 
 
 def format_capture_reply(is_capture: bool) -> str:
-    return f"capr_{1 if is_capture else 0}"
\ No newline at end of file
+    return f"capr_{1 if is_capture else 0}"
@@ -14,34 +14,37 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
-from collections import defaultdict
 
 import chess  # type: ignore
 import chess.pgn  # type: ignore
 
+from piChessBackend import SQ_TABLE, parse_uci_cached
 from piDisplay import Display
 from piSerial import BoardLink
 from .lichess_client import LichessClient
+from .protocol import SIDE_NAME, TURN_MSG, parse_uci_like
 
 
 # -------------------- LED-guided physical setup helpers --------------------
 
 
 def _dist(a: str, b: str) -> int:
-    af, ar = ord(a[0]) - 97, int(a[1]) - 1
-    bf, br = ord(b[0]) - 97, int(b[1]) - 1
-    return abs(af - bf) + abs(ar - br)
+    # Square names come from SQ_TABLE, so no per-call int()/ord() parsing
+    sa, sb = SQ_TABLE[a], SQ_TABLE[b]
+    return abs((sa & 7) - (sb & 7)) + abs((sa >> 3) - (sb >> 3))
 
 
 def _pieces_by_type_and_color(brd: chess.Board):
-    buckets = defaultdict(list)  # (color, piece_type) -> [sq,...]
-    for sq in chess.SQUARES:
-        p = brd.piece_at(sq)
-        if not p:
-            continue
-        buckets[(p.color, p.piece_type)].append(chess.square_name(sq))
-    for k in buckets:
-        buckets[k].sort()
+    # Read each (color, piece_type) bitboard instead of piece_at() on all
+    # 64 squares, which builds a Piece object per occupied square.
+    buckets = {}  # (color, piece_type) -> [sq,...]
+    for color in chess.COLORS:
+        for ptype in chess.PIECE_TYPES:
+            mask = brd.pieces_mask(ptype, color)
+            if mask:
+                buckets[(color, ptype)] = sorted(
+                    chess.SQUARE_NAMES[sq] for sq in chess.scan_forward(mask)
+                )
     return buckets
 
 
@@ -103,16 +106,18 @@ def _compute_setup_actions_from_start(target_fen: str):
     return removes_b + moves_b + removes_w + moves_w
 
 
+_PIECE_NAMES = {
+    "P": "PAWN",
+    "N": "KNIGHT",
+    "B": "BISHOP",
+    "R": "ROOK",
+    "Q": "QUEEN",
+    "K": "KING",
+}
+
+
 def _piece_name(sym: str) -> str:
-    u = sym.upper()
-    return {
-        "P": "PAWN",
-        "N": "KNIGHT",
-        "B": "BISHOP",
-        "R": "ROOK",
-        "Q": "QUEEN",
-        "K": "KING",
-    }.get(u, "PIECE")
+    return _PIECE_NAMES.get(sym.upper(), "PIECE")
 
 
 @dataclass
@@ -140,7 +145,7 @@ def _board_from_pgn_at_ply(pgn_text: str, initial_ply: int) -> chess.Board:
 
 def _is_cap(board: chess.Board, uci: str) -> bool:
     try:
-        mv = chess.Move.from_uci(uci)
+        mv = parse_uci_cached(uci)
         return board.is_capture(mv)
     except Exception:
         return False
@@ -152,10 +157,10 @@ def _play_solution_prefix_len(b: chess.Board, sol: List[str]) -> int:
     n = 0
     for u in sol:
         try:
-            mv = chess.Move.from_uci(u)
+            mv = parse_uci_cached(u)
         except Exception:
             break
-        if mv not in tmp.legal_moves:
+        if not tmp.is_legal(mv):
             break
         tmp.push(mv)
         n += 1
@@ -293,9 +298,7 @@ class DailyPuzzleController:
 
                 # wait for OK after each step
                 while True:
-                    msg = link.getboard()
-                    if msg is None:
-                        continue
+                    msg = link.getboard(block=True)
 
                     if msg == "shutdown":
                         from piGame import shutdown_pi
@@ -322,17 +325,15 @@ class DailyPuzzleController:
         board = chess.Board(st.fen_start)
 
         # You always play the side-to-move at the puzzle start position
-        player_color = "WHITE" if board.turn == chess.WHITE else "BLACK"
+        player_color = SIDE_NAME[board.turn]
 
-        link.sendtoboard(f"turn_{'white' if board.turn == chess.WHITE else 'black'}")
+        link.sendtoboard(TURN_MSG[board.turn])
         display.send(f"Daily Puzzle\nYou are {player_color}\nEnter move:")
 
         # Helper: wait for OK acknowledgement coming from Pico (requires Pico patch above)
         def _wait_ack_ok() -> bool:
             while True:
-                m = link.getboard()
-                if m is None:
-                    continue
+                m = link.getboard(block=True)
 
                 if m == "shutdown":
                     from piGame import shutdown_pi
@@ -367,9 +368,7 @@ class DailyPuzzleController:
 
             expected = st.solution[st.idx]
 
-            msg = link.getboard()
-            if msg is None:
-                continue
+            msg = link.getboard(block=True)
 
             if msg == "shutdown":
                 from piGame import shutdown_pi
@@ -382,15 +381,12 @@ class DailyPuzzleController:
 
             # Capture probe from Pico (user-move capture blink UX)
             if msg.startswith("capq_"):
-                q = msg[len("capq_") :].strip().lower()
-                q = "".join(ch for ch in q if ch.isalnum())
-                cap_flag = 0
-                try:
-                    mvq = chess.Move.from_uci(q)
-                    cap_flag = 1 if board.is_capture(mvq) else 0
-                except Exception:
-                    cap_flag = 0
-                link.sendtoboard(f"capr_{cap_flag}")
+                from piGame import compute_capture_preview
+
+                # Validated up front; the bitboard test itself never raises
+                q = parse_uci_like(msg[5:])
+                cap = compute_capture_preview(board, q) if q else False
+                link.sendtoboard(f"capr_{1 if cap else 0}")
                 continue
 
             # Hint
@@ -435,13 +431,13 @@ class DailyPuzzleController:
 
             # Must be legal in local position too
             try:
-                mv = chess.Move.from_uci(expected)
+                mv = parse_uci_cached(expected)
             except Exception:
                 display.send("Puzzle error")
                 link.sendtoboard("error_puzzle_parse")
                 return
 
-            if mv not in board.legal_moves:
+            if not board.is_legal(mv):
                 link.sendtoboard(f"error_illegal_{expected}")
                 display.send("Try again\nEnter move")
                 continue
@@ -457,14 +453,14 @@ class DailyPuzzleController:
             if st.idx < len(st.solution):
                 reply = st.solution[st.idx]
                 try:
-                    rmv = chess.Move.from_uci(reply)
+                    rmv = parse_uci_cached(reply)
                 except Exception:
                     display.send("Puzzle error")
                     link.sendtoboard("error_puzzle_parse")
                     return
 
-                if rmv in board.legal_moves:
-                    opp = "WHITE" if board.turn == chess.WHITE else "BLACK"
+                if board.is_legal(rmv):
+                    opp = SIDE_NAME[board.turn]
                     cap = board.is_capture(rmv)
 
                     display.send(
@@ -484,8 +480,6 @@ class DailyPuzzleController:
                     display.send(f"You are {player_color}\nEnter move:")
 
             # Next prompt for normal flow (if there was no opponent move)
-            link.sendtoboard(
-                f"turn_{'white' if board.turn == chess.WHITE else 'black'}"
-            )
+            link.sendtoboard(TURN_MSG[board.turn])
             # Keep consistent prompt text
             display.send(f"You are {player_color}\nEnter move:")
@@ -8,8 +8,12 @@ import chess  # type: ignore
 
 from .opponent import Opponent
 from piEngine import EngineContext, engine_bestmove
+from piLog import get_logger
+
+log = get_logger("stockfish")
+
+log.debug("LOADED StockfishOpponent from: %s", __file__)
 
-print("LOADED StockfishOpponent from:", __file__, flush=True)
 
 def clamp(n: int, lo: int, hi: int) -> int:
     return lo if n < lo else hi if n > hi else n
@@ -29,6 +33,7 @@ def map_skill_to_elo(skill_level: int) -> int:
     elo_steps = [650, 850, 1050, 1250, 1450, 1650, 1850, 2050]
     return elo_steps[clamp(idx, 0, 7)]
 
+
 def map_raw_skill_to_beginner_skill(raw_0_20: int) -> int:
     """
     raw_0_20 comes from Pico (mapped 1..8 -> 1..20).
@@ -71,37 +76,35 @@ class StockfishOpponent(Opponent):
         if self._configured and self._last_skill == self.skill_level:
             return
 
-        import sys, traceback
-
-        engine = self.ctx.ensure()
-
-        # Print BEFORE we try anything
-        print(f"[ENGINE CONFIG] about to configure. skill={self.skill_level} use_elo={self.use_elo}",
-            file=sys.stderr, flush=True)
+        # Log BEFORE we try anything
+        log.debug(
+            "[ENGINE CONFIG] about to configure. skill=%s use_elo=%s",
+            self.skill_level,
+            self.use_elo,
+        )
 
         try:
             if self.use_elo:
                 elo = map_skill_to_elo(self.skill_level)
-                print(f"[ENGINE CONFIG] requesting UCI_Elo={elo}", file=sys.stderr, flush=True)
+                log.debug("[ENGINE CONFIG] requesting UCI_Elo=%s", elo)
 
-                engine.configure({"UCI_LimitStrength": True, "UCI_Elo": elo})
+                self.ctx.configure({"UCI_LimitStrength": True, "UCI_Elo": elo})
 
-                print("[ENGINE CONFIG] configure OK (elo)", file=sys.stderr, flush=True)
+                log.debug("[ENGINE CONFIG] configure OK (elo)")
             else:
                 mapped = map_raw_skill_to_beginner_skill(self.skill_level)
-                print(
-                    f"[ENGINE CONFIG] requesting Skill Level={mapped} (raw={self.skill_level})",
-                    file=sys.stderr,
-                    flush=True,
+                log.debug(
+                    "[ENGINE CONFIG] requesting Skill Level=%s (raw=%s)",
+                    mapped,
+                    self.skill_level,
                 )
 
-                engine.configure({"UCI_LimitStrength": False, "Skill Level": mapped})
+                self.ctx.configure({"UCI_LimitStrength": False, "Skill Level": mapped})
 
-                print("[ENGINE CONFIG] configure OK (skill)", file=sys.stderr, flush=True)
+                log.debug("[ENGINE CONFIG] configure OK (skill)")
 
-        except Exception as e:
-            print("[ENGINE CONFIG ERROR]", repr(e), file=sys.stderr, flush=True)
-            traceback.print_exc()
+        except Exception:
+            log.exception("[ENGINE CONFIG ERROR]")
             # IMPORTANT: still mark configured so you don't spam errors every move?
             # For debugging, DON'T mark configured on error:
             return
@@ -111,7 +114,6 @@ class StockfishOpponent(Opponent):
         self._last_skill = self.skill_level
 
     def get_move(self, board: chess.Board) -> Optional[str]:
-        import sys
-        print("[DEBUG] StockfishOpponent.get_move called", file=sys.stderr, flush=True)
+        log.debug("[DEBUG] StockfishOpponent.get_move called")
         self._ensure_configured()
-        return engine_bestmove(self.ctx, board, self.move_time_ms)
\ No newline at end of file
+        return engine_bestmove(self.ctx, board, self.move_time_ms)
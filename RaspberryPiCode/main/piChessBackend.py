@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Chess backend selection for SmarterChess (modular version).
+- Board is a native (Cython/Rust) python-chess compatible board when one is
+  installed, plain chess.Board otherwise.
+- Move/square parsing helpers used on the Pico message hot path.
+"""
+from typing import Optional, Tuple
+import re
+import chess  # type: ignore
+
+# Optional native board. Only accepted if it is a real chess.Board subclass,
+# since the engine, PGN and puzzle code all take python-chess boards.
+try:
+    from cython_chess import Board as _NativeBoard  # type: ignore
+
+    if not issubclass(_NativeBoard, chess.Board):
+        raise ImportError("cython_chess.Board is not a chess.Board")
+    Board = _NativeBoard
+except ImportError:
+    Board = chess.Board
+
+BACKEND: str = "native" if Board is not chess.Board else "python-chess"
+
+# "e4" -> chess.E4 without going through chess.parse_square
+SQ_TABLE = {
+    f"{f}{r}": (ord(f) - 97) + (ord(r) - 49) * 8 for f in "abcdefgh" for r in "12345678"
+}
+
+# uci string -> (from_sq, to_sq), or None if not a square pair
+_SQ_PAIR_CACHE: dict = {}
+_SQ_PAIR_CACHE_MAX = 256
+
+
+def uci_squares(uci: str) -> Optional[Tuple[int, int]]:
+    """
+    Squares of a UCI-like string in one dict hit; the Pico re-sends the same
+    capq_ payloads while a move is being typed, so slicing happens once.
+    """
+    try:
+        return _SQ_PAIR_CACHE[uci]
+    except KeyError:
+        pass
+    frm = SQ_TABLE.get(uci[0:2])
+    to = SQ_TABLE.get(uci[2:4])
+    pair = (frm, to) if frm is not None and to is not None else None
+    if len(_SQ_PAIR_CACHE) >= _SQ_PAIR_CACHE_MAX:
+        _SQ_PAIR_CACHE.clear()
+    _SQ_PAIR_CACHE[uci] = pair
+    return pair
+
+
+_MOVE_CACHE: dict = {}
+_MOVE_CACHE_MAX = 256
+
+# Plain board moves, validated in one compiled pass; anything else (null
+# moves, drops, garbage) goes through chess.Move.from_uci.
+_PLAIN_UCI_RE = re.compile(r"[a-h][1-8][a-h][1-8][qrbn]?")
+_PROMO_PIECE = {
+    "": None,
+    "q": chess.QUEEN,
+    "r": chess.ROOK,
+    "b": chess.BISHOP,
+    "n": chess.KNIGHT,
+}
+
+
+def parse_uci_cached(uci: str) -> chess.Move:
+    """chess.Move.from_uci with a small cache. Raises ValueError like from_uci."""
+    move = _MOVE_CACHE.get(uci)
+    if move is None:
+        if _PLAIN_UCI_RE.fullmatch(uci) and uci[0:2] != uci[2:4]:
+            move = chess.Move(
+                SQ_TABLE[uci[0:2]], SQ_TABLE[uci[2:4]], _PROMO_PIECE[uci[4:]]
+            )
+        else:
+            move = chess.Move.from_uci(uci)
+        if len(_MOVE_CACHE) >= _MOVE_CACHE_MAX:
+            _MOVE_CACHE.clear()
+        _MOVE_CACHE[uci] = move
+    return move
+
+
+def is_game_over_fast(brd: chess.Board) -> bool:
+    """
+    Same verdict as brd.is_game_over(). Fivefold repetition needs 16
+    reversible plies and the 75-move rule 150, so below that the move-stack
+    scans are skipped and only mate/stalemate/material are checked.
+    """
+    if brd.halfmove_clock < 16:
+        return brd.is_insufficient_material() or not any(brd.generate_legal_moves())
+    return brd.is_game_over()
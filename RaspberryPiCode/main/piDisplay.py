@@ -6,45 +6,248 @@ Display abstraction for SmarterChess (modular version)
 """
 import os
 import time
-import subprocess
+import select
+import ctypes
+import ctypes.util
+import signal
 from typing import Optional
 
 PIPE_PATH: str = "/tmp/lcdpipe"
 READY_FLAG_PATH: str = "/tmp/display_server_ready"
-DISPLAY_SERVER_SCRIPT: str = "/home/king/SmarterChess-DIY2026/RaspberryPiCode/screen/display_server.py"
+DISPLAY_SERVER_SCRIPT: str = (
+    "/home/king/SmarterChess-DIY2026/RaspberryPiCode/screen/display_server.py"
+)
+
+# inotify(7) event masks
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+
+# Pre-framed pipe messages for the fixed screens
+_SIZE_SUFFIX = {"auto": b"|auto\n"}
+_PROMPT_MOVE = {
+    "WHITE": b"You are white|Enter move:|auto\n",
+    "BLACK": b"You are black|Enter move:|auto\n",
+}
+_ILLEGAL = b"Illegal move!|Enter new|move...|auto\n"
+_HINT_THINKING = b"Hint|Thinking...|auto\n"
+
+# stdout/stderr of the spawned server go to /dev/null
+_SPAWN_DEVNULL = [
+    (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+    (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0),
+]
+
+
+def _find_pids(needle: bytes) -> list:
+    """
+    PIDs whose command line contains 'needle' (pkill -f without the fork).
+    """
+    me = os.getpid()
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit() or int(name) == me:
+            continue
+        try:
+            with open(f"/proc/{name}/cmdline", "rb") as f:
+                if needle in f.read():
+                    pids.append(int(name))
+        except OSError:
+            pass
+    return pids
+
+
+def _alive(pid: int) -> bool:
+    # Reap it first if it was our own child, or it lingers as a zombie.
+    try:
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    return os.path.exists(f"/proc/{pid}")
+
 
 class Display:
     """
     Minimal abstraction around display_server IPC.
     """
+
     def __init__(self, pipe_path: str = PIPE_PATH, ready_flag: str = READY_FLAG_PATH):
         self.pipe_path = pipe_path
         self.ready_flag = ready_flag
+        # Writer fd of the FIFO, opened lazily and kept across sends.
+        self._fd: Optional[int] = None
+        self._last_payload: Optional[bytes] = None
+        # (message, size) that produced _last_payload, so repeats of the
+        # same send() are dropped before any encoding.
+        self._last_key: Optional[tuple] = None
+        # send_throttled(): time of the last throttled frame, and the
+        # (message, due time) parked because it came in too soon.
+        self._throttle_ts = 0.0
+        self._parked: Optional[tuple] = None
+
+    def _open_pipe(self) -> bool:
+        try:
+            # Non-blocking open fails fast (ENXIO) instead of hanging when
+            # no display server is reading; writes themselves stay blocking.
+            fd = os.open(self.pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            return False
+        os.set_blocking(fd, True)
+        self._fd = fd
+        return True
+
+    def _close_pipe(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+        self._last_payload = None
+        self._last_key = None
 
     def restart_server(self) -> None:
-        subprocess.Popen("pkill -f display_server.py", shell=True,
-                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        time.sleep(0.2)
+        self._close_pipe()
+        pids = _find_pids(b"display_server.py")
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # Wait for the old server to go away instead of a fixed sleep,
+        # so it cannot race the new one for the FIFO and the panel.
+        deadline = time.monotonic() + 1.0
+        while pids and time.monotonic() < deadline:
+            pids = [pid for pid in pids if _alive(pid)]
+            if pids:
+                time.sleep(0.01)
         if not os.path.exists(self.pipe_path):
             try:
                 os.mkfifo(self.pipe_path)
             except FileExistsError:
                 pass
-        subprocess.Popen(["python3", DISPLAY_SERVER_SCRIPT],
-                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.posix_spawnp(
+            "python3",
+            ["python3", DISPLAY_SERVER_SCRIPT],
+            os.environ,
+            file_actions=_SPAWN_DEVNULL,
+        )
+
+    def _wait_ready_inotify(self, timeout_s: float) -> bool:
+        """
+        Block on an inotify watch of the flag's directory until the flag
+        appears or the timeout expires. Returns False if inotify is unavailable.
+        """
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+        try:
+            watch_dir = os.path.dirname(self.ready_flag) or "."
+            if (
+                libc.inotify_add_watch(
+                    fd, watch_dir.encode(), _IN_CREATE | _IN_MOVED_TO
+                )
+                < 0
+            ):
+                return False
+            deadline = time.monotonic() + timeout_s
+            # Checked after the watch is in place, so a flag created in
+            # between is not missed.
+            while not os.path.exists(self.ready_flag):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                readable, _, _ = select.select([fd], [], [], remaining)
+                if readable:
+                    try:
+                        os.read(fd, 4096)
+                    except BlockingIOError:
+                        pass
+            return True
+        finally:
+            os.close(fd)
 
     def wait_ready(self, timeout_s: float = 10.0) -> None:
+        if os.path.exists(self.ready_flag) or self._wait_ready_inotify(timeout_s):
+            return
         start = time.time()
         while not os.path.exists(self.ready_flag):
             if time.time() - start > timeout_s:
                 break
             time.sleep(0.05)
 
-    def send(self, message: str, size: str = "auto") -> None:
-        parts = message.split("\n")
-        payload = "|".join(parts) + f"|{size}\n"
-        with open(self.pipe_path, "w") as pipe:
-            pipe.write(payload)
+    def send(self, message: str, size: str = "auto", sticky: bool = False) -> None:
+        """
+        sticky: the display server draws this frame even if newer ones
+        arrive before it gets to it (for screens that must be seen).
+        """
+        self._parked = None  # whatever is sent now supersedes it
+        key = (message, size, sticky)
+        if key == self._last_key:
+            return
+        suffix = _SIZE_SUFFIX.get(size)
+        if suffix is None:
+            suffix = _SIZE_SUFFIX[size] = f"|{size}\n".encode("utf-8")
+        payload = message.replace("\n", "|").encode("utf-8") + suffix
+        if sticky:
+            payload = b"!" + payload
+        self._write(payload)
+        if payload == self._last_payload:
+            self._last_key = key
+
+    def _write(self, payload: bytes) -> None:
+        """
+        Write one ready-framed "L1|L2|..|size\n" message to the pipe.
+        """
+        self._parked = None
+        if payload == self._last_payload:
+            return
+        # One retry: a restarted display server leaves our old fd broken.
+        for _ in range(2):
+            if self._fd is None and not self._open_pipe():
+                return
+            try:
+                os.write(self._fd, payload)
+                self._last_payload = payload
+                self._last_key = None
+                return
+            except BrokenPipeError:
+                self._close_pipe()
+
+    def send_throttled(self, message: str, min_interval_s: float = 0.05) -> None:
+        """
+        send() for rapid-fire frames such as typing previews: at most one
+        per min_interval_s. A frame that comes in sooner is parked (a newer
+        one replaces it) until flush_pending() draws it; any other send
+        drops it.
+        """
+        now = time.monotonic()
+        if now - self._throttle_ts < min_interval_s:
+            self._parked = (message, self._throttle_ts + min_interval_s)
+            return
+        self.send(message)
+        self._throttle_ts = now
+
+    def flush_pending(self) -> Optional[float]:
+        """
+        Draw the parked frame if it is due. Returns the seconds until it is,
+        or None when nothing is parked.
+        """
+        if self._parked is None:
+            return None
+        message, due = self._parked
+        left = due - time.monotonic()
+        if left > 0:
+            return left
+        self.send(message)
+        self._throttle_ts = time.monotonic()
+        return None
 
     # Convenience UI helpers
     def banner(self, text: str, delay_s: float = 0.0) -> None:
@@ -60,8 +263,12 @@ class Display:
             self.send(arrow)
 
     def prompt_move(self, side: str) -> None:
-        # side is human-friendly descriptor: "WHITE" or "BLACK" 
-        self.send(f"You are {side.lower()}\nEnter move:")
+        # side is human-friendly descriptor: "WHITE" or "BLACK"
+        payload = _PROMPT_MOVE.get(side)
+        if payload is None:
+            self.send(f"You are {side.lower()}\nEnter move:")
+        else:
+            self._write(payload)
 
     def show_hint_result(self, uci: str) -> None:
         """
@@ -79,19 +286,19 @@ class Display:
         except Exception:
             self.send(f"Hint received:\n{uci}")
 
-    '''
+    """
         def show_hint_result(self, uci: str) -> None:
             self.show_arrow(uci)
-    '''
+    """
 
     def show_invalid(self, text: str) -> None:
         self.send(f"Invalid\n{text}\nTry again")
 
     def show_illegal(self, uci: str, side_name: str) -> None:
-        self.send(f"Illegal move!\nEnter new\nmove...")
+        self._write(_ILLEGAL)
 
     def show_gameover(self, result: str) -> None:
-        self.send(f"Game Over\nResult {result}\nPress n to start over")
+        self.send(f"Game Over\nResult {result}\nPress n to start over", sticky=True)
 
     def show_hint_thinking(self) -> None:
-        self.send("Hint\nThinking...")
+        self._write(_HINT_THINKING)
@@ -3,49 +3,180 @@
 Engine context and helpers (Stockfish) for SmarterChess (modular version).
 """
 from typing import Optional
+import os
 import time
 import chess  # type: ignore
-import chess.engine  # type: ignore  
+import chess.engine  # type: ignore
 
 STOCKFISH_PATH: str = "/usr/games/stockfish"
 
+
 class EngineContext:
-    def __init__(self):
+    def __init__(self, ponder: bool = True):
         self.engine: Optional[chess.engine.SimpleEngine] = None
+        # Background search on the expected position while the human thinks.
+        self.ponder = ponder
+        self._ponder = None  # chess.engine.SimpleAnalysisResult
+        self._ponder_board: Optional[chess.Board] = None
+        self._ponder_t0 = 0.0
+        # UCI options wanted (survive a respawn) and those the running
+        # engine already has (only the difference is sent).
+        self._options: dict = {
+            # Stockfish defaults to one thread and a 16 MB table; the Pi has 4
+            # cores. One stays free: pondering runs while the human thinks and
+            # must not starve the UART loop and the display server.
+            "Threads": max(1, (os.cpu_count() or 2) - 1),
+            "Hash": 64,
+        }
+        self._applied: dict = {}
 
     def ensure(self, path: str = STOCKFISH_PATH) -> chess.engine.SimpleEngine:
         if self.engine is not None:
-            return self.engine
+            # returncode resolves once the Stockfish process has exited
+            if not self.engine.protocol.returncode.done():
+                return self.engine
+            self.discard()
         while True:
             try:
-                self.engine = chess.engine.SimpleEngine.popen_uci(path, stderr=None, timeout=None)
-                return self.engine
+                self.engine = chess.engine.SimpleEngine.popen_uci(
+                    path, stderr=None, timeout=None
+                )
+                break
             except Exception:
                 time.sleep(1)
+        self._applied = {}
+        try:
+            self._apply(self._options)
+        except chess.engine.EngineError:
+            pass
+        return self.engine
+
+    def discard(self) -> None:
+        """
+        Forget a dead engine so ensure() respawns it. close() still runs:
+        it ends the old transport and python-chess's event-loop thread.
+        """
+        engine, self.engine = self.engine, None
+        self._ponder = None
+        self._ponder_board = None
+        if engine is not None:
+            try:
+                engine.close()
+            except Exception:
+                pass
+
+    def _apply(self, options: dict) -> None:
+        changed = {k: v for k, v in options.items() if self._applied.get(k) != v}
+        if changed:
+            self.stop_ponder()  # setoption is not allowed mid-search
+            self.engine.configure(changed)
+            self._applied.update(changed)
+
+    def configure(self, options: dict) -> None:
+        """
+        Set UCI options once. Unchanged values are not re-sent, and the
+        options are reapplied if the engine has to be respawned.
+        """
+        self._options.update(options)
+        self.ensure()
+        self._apply(options)
+
+    def start_ponder(self, brd: chess.Board) -> None:
+        if not self.ponder or self.engine is None:
+            return
+        self.stop_ponder()
+        try:
+            self._ponder = self.engine.analysis(brd)
+        except Exception:
+            return
+        self._ponder_board = brd
+        self._ponder_t0 = time.monotonic()
+
+    def stop_ponder(self, brd: Optional[chess.Board] = None) -> float:
+        """
+        Stop the background search. Returns the seconds it already spent
+        on 'brd' (0.0 if it was searching some other position).
+        """
+        if self._ponder is None:
+            return 0.0
+        elapsed = time.monotonic() - self._ponder_t0
+        hit = (
+            brd is not None
+            and brd._transposition_key() == self._ponder_board._transposition_key()
+        )
+        try:
+            self._ponder.stop()
+            self._ponder.wait()
+        except Exception:
+            pass
+        self._ponder = None
+        self._ponder_board = None
+        return elapsed if hit else 0.0
 
     def quit(self):
         if self.engine:
+            self.stop_ponder()
             try:
                 self.engine.quit()
             except Exception:
                 pass
             self.engine = None
 
+
+# Limits are immutable per think time, so build each one once.
+_LIMIT_CACHE: dict = {}
+
+
+def _limit(ms: int) -> chess.engine.Limit:
+    limit = _LIMIT_CACHE.get(ms)
+    if limit is None:
+        limit = _LIMIT_CACHE[ms] = chess.engine.Limit(time=max(0.01, ms / 1000.0))
+    return limit
+
+
 def engine_bestmove(ctx: EngineContext, brd: chess.Board, ms: int) -> Optional[str]:
     if brd.is_game_over():
         return None
-    engine = ctx.ensure(STOCKFISH_PATH)
-    limit = chess.engine.Limit(time=max(0.01, ms / 1000.0))
-    result = engine.play(brd, limit)  # type: ignore 
+    # A ponder hit already searched this position: only spend what is left.
+    pondered_s = ctx.stop_ponder(brd)
+    if pondered_s:
+        limit = chess.engine.Limit(time=max(0.01, ms / 1000.0 - pondered_s))
+    else:
+        limit = _limit(ms)
+    # One retry: a crashed Stockfish is dropped so ensure() respawns it.
+    for attempt in range(2):
+        engine = ctx.ensure(STOCKFISH_PATH)
+        try:
+            result = engine.play(brd, limit)  # type: ignore
+            break
+        except chess.engine.EngineTerminatedError:
+            ctx.discard()
+            if attempt:
+                raise
+    if result.move and result.ponder:
+        expected = brd.copy()
+        expected.push(result.move)
+        expected.push(result.ponder)
+        ctx.start_ponder(expected)
     return result.move.uci() if result.move else None
 
+
 def engine_hint(ctx: EngineContext, brd: chess.Board, ms: int) -> Optional[str]:
+    # The engine runs one search at a time: pause pondering for the hint.
+    pondering = ctx._ponder_board
+    ctx.stop_ponder()
     try:
         engine = ctx.ensure(STOCKFISH_PATH)
-        info = engine.analyse(brd, chess.engine.Limit(time=max(0.01, ms / 1000.0)))  # type: ignore
+        info = engine.analyse(brd, _limit(ms))  # type: ignore
         pv = info.get("pv")
         if pv:
             return pv[0].uci()
+    except chess.engine.EngineTerminatedError:
+        ctx.discard()
+        pondering = None
     except Exception:
         pass
+    finally:
+        if pondering is not None:
+            ctx.start_ponder(pondering)
     return engine_bestmove(ctx, brd, ms)
@@ -5,13 +5,15 @@ Preserves Pico<->Pi UART protocol strings and display behavior.
 """
 from __future__ import annotations
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional
+import logging
 import random
 import time
-import traceback
-import subprocess
 import sys
+import threading
 
 # Allow importing sibling packages (RaspberryPiCode/app) when running from
 # RaspberryPiCode/main under systemd.
@@ -24,99 +26,172 @@ import chess  # type: ignore
 from piDisplay import Display
 from piSerial import BoardLink
 from piEngine import EngineContext, engine_bestmove, engine_hint
+from piLog import get_logger
+from piChessBackend import is_game_over_fast, parse_uci_cached, uci_squares
+
+from app.protocol import (
+    SIDE_NAME,
+    TK_HINT,
+    TK_NEW,
+    TK_OK,
+    TK_SHUTDOWN,
+    TOKEN_KIND_B,
+    TURN_MSG,
+    parse_uci_like,
+)
 
-# Phase 1: daily puzzle controller
-from app.lichess_client import LichessClient
-from app.puzzle_controller import DailyPuzzleController
+log = get_logger("game")
 
 # -------------------- Data classes --------------------
 
+# __slots__ instead of a per-instance __dict__ (dataclass slots need 3.10+;
+# older interpreters fall back to plain dataclasses).
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
-@dataclass
+@dataclass(**_SLOTS)
 class GameConfig:
     skill_level: int = 5
     move_time_ms: int = 2000
     human_is_white: bool = True
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class RuntimeState:
     board: chess.Board
     mode: str = "stockfish"  # "stockfish" | "local" | "online" | "puzzle"
+    # Kept in sync by push_and_update(); only changes when a move is pushed.
+    game_over: bool = False
+    # Position key of 'board' (chess.Board._transposition_key), refreshed
+    # once per push instead of recomputed by every cache lookup.
+    zkey: tuple = ()
 
+    def __post_init__(self):
+        if not self.zkey:
+            self.zkey = self.board._transposition_key()
 
-# -------------------- Parsing & helpers --------------------
+    def reset_board(self) -> None:
+        """Back to the start position, reusing the Board object."""
+        self.board.reset()
+        self.zkey = self.board._transposition_key()
 
 
-RESERVED_NON_MOVES = {"ok", "btnok", "btn_ok", "draw", "btn_draw", "hint", "btn_hint", "n", "new", "in", "newgame", "btn_new"}
+# -------------------- Parsing & helpers --------------------
 
 
 def parse_move_payload(payload: str) -> Optional[str]:
-    if not payload:
-        return None
-    p = payload.strip().lower()
-    if p.startswith("m"):
-        p = p[1:].strip()
-    cleaned = "".join(ch for ch in p if ch.isalnum())
-    if 4 <= len(cleaned) <= 5 and cleaned.isalnum():
-        if cleaned in RESERVED_NON_MOVES:
-            return None
-        return cleaned
-    return None
+    return parse_uci_like(payload)
+
+
+_SIDE_CHOICES = {"s1": True, "s2": False}
 
 
 def parse_side_choice(s: str) -> Optional[bool]:
-    s = (s or "").strip().lower()
-    if s.startswith("s1"):
-        return True
-    if s.startswith("s2"):
-        return False
-    if s.startswith("s3"):
+    s = (s or "").strip().lower()[:2]
+    side = _SIDE_CHOICES.get(s)
+    if side is None and s == "s3":
         return bool(random.getrandbits(1))
-    return None
+    return side
+
+
+def with_promotion(move: chess.Move, promo: str) -> chess.Move:
+    """Same squares as 'move', promoting to 'promo' ('q','r','b','n')."""
+    return chess.Move(
+        move.from_square, move.to_square, promotion=chess.PIECE_SYMBOLS.index(promo)
+    )
 
 
 def compute_capture_preview(brd: chess.Board, uci: str) -> bool:
     """
     Return True if moving side would capture something on 'to' square
     in current position, including en passant. Does not validate legality.
+    Works directly on the board's integer bitboards and never raises, so
+    callers need no exception guard.
     """
-    try:
-        from_sq = chess.parse_square(uci[:2])
-        to_sq = chess.parse_square(uci[2:4])
-    except Exception:
+    squares = uci_squares(uci)
+    if squares is None:
         return False
+    from_sq, to_sq = squares
 
     # If there's an opponent piece on 'to', that's a capture
-    target = brd.piece_at(to_sq)
-    if target and target.color != brd.turn:
+    if brd.occupied_co[not brd.turn] & (1 << to_sq):
         return True
 
-    # En passant: pawn moves diagonally to ep square which is empty
-    mover = brd.piece_at(from_sq)
-    if mover and mover.piece_type == chess.PAWN and brd.ep_square == to_sq:
-        # ensure diagonal direction
-        if abs(chess.square_file(to_sq) - chess.square_file(from_sq)) == 1:
-            return True
+    # En passant: own pawn moves diagonally onto the ep square
+    return (
+        brd.ep_square == to_sq
+        and bool(brd.pawns & brd.occupied_co[brd.turn] & (1 << from_sq))
+        and abs((to_sq & 7) - (from_sq & 7)) == 1
+    )
 
-    return False
+
+# (position key, move) -> legality verdict, least recently used first.
+# requires_promotion and the legality step ask about the same move in the
+# same position each turn.
+_LEGAL_CACHE: "OrderedDict[tuple, bool]" = OrderedDict()
+_LEGAL_CACHE_MAX = 256
+
+
+def is_legal_fast(
+    brd: chess.Board, move: chess.Move, zkey: Optional[tuple] = None
+) -> bool:
+    """
+    Legality test for a single move without generating the full legal
+    move list. Castling goes through the full check (path attacks).
+    zkey: brd's position key, if the caller already tracks it.
+    """
+    key = (brd._transposition_key() if zkey is None else zkey, move)
+    legal = _LEGAL_CACHE.get(key)
+    if legal is not None:
+        _LEGAL_CACHE.move_to_end(key)
+        return legal
+
+    if not brd.is_pseudo_legal(move):
+        legal = False
+    elif brd.is_castling(move):
+        legal = brd.is_legal(move)
+    else:
+        legal = not brd.is_into_check(move)
+
+    _LEGAL_CACHE[key] = legal
+    if len(_LEGAL_CACHE) > _LEGAL_CACHE_MAX:
+        _LEGAL_CACHE.popitem(last=False)
+    return legal
 
 
 # -------------------- Promotion --------------------
 
 
-def requires_promotion(move: chess.Move, brd: chess.Board) -> bool:
-    if move not in brd.legal_moves:
-        return False
-    piece = brd.piece_at(move.from_square)
-    if piece is None or piece.piece_type != chess.PAWN:
-        return False
-    to_rank = chess.square_rank(move.to_square)
-    if brd.turn == chess.WHITE and to_rank == 7:
-        return move.promotion is None
-    if brd.turn == chess.BLACK and to_rank == 0:
-        return move.promotion is None
-    return False
+def requires_promotion(
+    move: chess.Move, brd: chess.Board, zkey: Optional[tuple] = None
+) -> bool:
+    """
+    True if 'move' is a legal pawn push/capture to the last rank that is
+    missing its promotion letter. Bitboard tests only, no square parsing.
+    """
+    return (
+        move.promotion is None
+        and bool(
+            brd.pawns & brd.occupied_co[brd.turn] & chess.BB_SQUARES[move.from_square]
+        )
+        and bool(
+            chess.BB_SQUARES[move.to_square]
+            & (chess.BB_RANK_8 if brd.turn else chess.BB_RANK_1)
+        )
+        and is_legal_fast(brd, with_promotion(move, "q"), zkey)
+    )
+
+
+_PROMO_DISPATCH = {
+    "btn_q": "q",
+    "btn_queen": "q",
+    "btn_r": "r",
+    "btn_rook": "r",
+    "btn_b": "b",
+    "btn_bishop": "b",
+    "btn_n": "n",
+    "btn_knight": "n",
+}
 
 
 def ask_promotion_piece(link: BoardLink, display: Display) -> str:
@@ -127,24 +202,65 @@ def ask_promotion_piece(link: BoardLink, display: Display) -> str:
     display.send("Promotion!\n1=Queen\n2=Rook\n3=Bishop\n4=Knight")
     link.sendtoboard("promotion_choice_needed")
     while True:
-        msg = link.getboard()
-        if msg is None:
-            continue
+        msg = link.getboard(block=True)
         if msg.startswith("n"):
             # Signal to caller to restart mode selection via exception
             raise GoToModeSelect()
-        m = msg.strip().lower()
-        if m in ("btn_q", "btn_queen"):
-            return "q"
-        if m in ("btn_r", "btn_rook"):
-            return "r"
-        if m in ("btn_b", "btn_bishop"):
-            return "b"
-        if m in ("btn_n", "btn_knight"):
-            return "n"
+        promo = _PROMO_DISPATCH.get(msg.strip().lower())
+        if promo:
+            return promo
         display.send("Promotion!\n1=Queen\n2=Rook\n3=Bishop\n4=Knight")
 
 
+# -------------------- Engine result cache --------------------
+
+# (position key, skill, think time) -> engine UCI, least recently used first.
+# Repeated positions skip the whole Stockfish search; hints and moves are
+# kept apart since a hint is the analysis PV, not a played move.
+_BESTMOVE_TT: "OrderedDict[tuple, str]" = OrderedDict()
+_HINT_TT: "OrderedDict[tuple, str]" = OrderedDict()
+_ENGINE_TT_MAX = 4096
+
+
+def _tt_lookup(tt, key: tuple, search, *args, on_hit=None) -> Optional[str]:
+    uci = tt.get(key)
+    if uci is not None:
+        tt.move_to_end(key)
+        if on_hit is not None:
+            on_hit()
+        return uci
+    uci = search(*args)
+    if uci is not None:
+        tt[key] = uci
+        if len(tt) > _ENGINE_TT_MAX:
+            tt.popitem(last=False)
+    return uci
+
+
+def _engine_cached(
+    tt, search, ctx: EngineContext, state: RuntimeState, cfg: GameConfig
+) -> Optional[str]:
+    key = (state.zkey, cfg.skill_level, cfg.move_time_ms)
+    return _tt_lookup(tt, key, search, ctx, state.board, cfg.move_time_ms)
+
+
+def cached_engine_move(ctx: EngineContext, key: tuple, search, *args) -> Optional[str]:
+    """
+    Engine move for 'key' (position key first, then whatever else changes
+    the answer) from the table; otherwise search(*args), remembered.
+    A hit skips engine_bestmove, so the ponder it would have stopped (on
+    the position before this move) is stopped here instead.
+    """
+    return _tt_lookup(_BESTMOVE_TT, key, search, *args, on_hit=ctx.stop_ponder)
+
+
+def reset_game_caches() -> None:
+    """New game: forget legality verdicts and engine answers."""
+    _LEGAL_CACHE.clear()
+    _BESTMOVE_TT.clear()
+    _HINT_TT.clear()
+
+
 # -------------------- Hints & game-over --------------------
 
 
@@ -161,14 +277,14 @@ def send_hint_to_board(
         return
 
     display.show_hint_thinking()
-    best = engine_hint(ctx, state.board, cfg.move_time_ms)
+    best = _engine_cached(_HINT_TT, engine_hint, ctx, state, cfg)
     if not best:
         link.sendtoboard("hint_none")
         return
 
     # Mark capture for hint if applicable
     try:
-        mv = chess.Move.from_uci(best)
+        mv = parse_uci_cached(best)
         is_cap = state.board.is_capture(mv)
     except Exception:
         is_cap = False
@@ -176,18 +292,26 @@ def send_hint_to_board(
     # Send to Pico and update OLED with arrow format
     link.sendtoboard(f"hint_{best}{'_cap' if is_cap else ''}")
     display.show_hint_result(best)
-    print(f"[Hint] {best}")
+    log.info("[Hint] %s", best)
 
 
 def side_name_from_board(brd: chess.Board) -> str:
-    return "WHITE" if brd.turn == chess.WHITE else "BLACK"
+    return SIDE_NAME[brd.turn]
 
 
-def report_game_over(link: BoardLink, display: Display, brd: chess.Board) -> str:
+def report_game_over(
+    link: BoardLink,
+    display: Display,
+    brd: chess.Board,
+    ctx: Optional[EngineContext] = None,
+) -> str:
+    # The game is decided: do not leave Stockfish pondering on every core.
+    if ctx is not None:
+        ctx.stop_ponder()
     result = brd.result(claim_draw=True)
     winner = winner_text_from_result(result)
     link.sendtoboard(f"GameOver:{result}")
-    display.send(f"GAME OVER\n{winner}\nStart new game?")
+    display.send(f"GAME OVER\n{winner}\nStart new game?", sticky=True)
     return result
 
 
@@ -198,27 +322,47 @@ class GoToModeSelect(Exception):
     pass
 
 
+def game_over_wait_ok_and_ack(link: BoardLink) -> None:
+    """
+    After game over, wait for the Pico's 'n' (OK) and go back to mode select.
+    Everything else (typing previews, hints) is swallowed.
+    """
+    # Whatever is already queued was sent around the final move: previews
+    # are stale now, but an 'n' the Pico already sent still counts.
+    for msg in link.drain_nonblocking_bytes():
+        if TOKEN_KIND_B.get(msg) == TK_NEW:
+            raise GoToModeSelect()
+    # Nothing else to do meanwhile, so block on the UART instead of
+    # waking up on every serial timeout.
+    while True:
+        if TOKEN_KIND_B.get(link.getboard_bytes(block=True)) == TK_NEW:
+            raise GoToModeSelect()
+
+
 # -------------------- Setup & mode selection --------------------
 
 
+_MODE_DISPATCH = {
+    **dict.fromkeys(("1", "stockfish", "pc", "btn_mode_pc"), "stockfish"),
+    **dict.fromkeys(
+        ("2", "onlinehuman", "remote", "online", "btn_mode_online"), "online"
+    ),
+    **dict.fromkeys(("3", "local", "human", "btn_mode_local"), "local"),
+    **dict.fromkeys(("4", "puzzle", "daily", "btn_mode_puzzle"), "puzzle"),
+}
+
+
 def select_mode(link: BoardLink, display: Display, state: RuntimeState) -> str:
     link.sendtoboard("ChooseMode")
     display.send(
         "Choose mode:\n1) Against PC\n2) Lichess Online\n3) Local 2-player\n4) Daily puzzle"
     )
     while True:
-        msg = link.getboard()
-        if msg is None:
-            continue
+        msg = link.getboard(block=True)
         m = msg.strip().lower()
-        if m in ("1", "stockfish", "pc", "btn_mode_pc"):
-            return "stockfish"
-        if m in ("2", "onlinehuman", "remote", "online", "btn_mode_online"):
-            return "online"
-        if m in ("3", "local", "human", "btn_mode_local"):
-            return "local"
-        if m in ("4", "puzzle", "daily", "btn_mode_puzzle"):
-            return "puzzle"
+        mode = _MODE_DISPATCH.get(m)
+        if mode:
+            return mode
         link.sendtoboard("error_unknown_mode")
         display.send("Unknown mode\n" + m + "\nSend again")
 
@@ -236,12 +380,9 @@ def setup_stockfish(link: BoardLink, display: Display, cfg: GameConfig) -> None:
 
     # Difficulty
     display.send("Choose computer\ndifficulty level:\n(0 -> 8)")
-    link.sendtoboard("EngineStrength")
-    link.sendtoboard(f"default_strength_{cfg.skill_level}")
+    link.sendtoboard_many(["EngineStrength", f"default_strength_{cfg.skill_level}"])
     while True:
-        msg = link.getboard()
-        if msg is None:
-            continue
+        msg = link.getboard(block=True)
         if msg.startswith("n"):
             raise GoToModeSelect()
         if msg.isdigit():
@@ -250,12 +391,9 @@ def setup_stockfish(link: BoardLink, display: Display, cfg: GameConfig) -> None:
 
     # Move time
     display.send("Choose computer\nmove time:\n(0 -> 8)")
-    link.sendtoboard("TimeControl")
-    link.sendtoboard(f"default_time_{cfg.move_time_ms}")
+    link.sendtoboard_many(["TimeControl", f"default_time_{cfg.move_time_ms}"])
     while True:
-        msg = link.getboard()
-        if msg is None:
-            continue
+        msg = link.getboard(block=True)
         if msg.startswith("n"):
             raise GoToModeSelect()
         if msg.isdigit():
@@ -266,9 +404,7 @@ def setup_stockfish(link: BoardLink, display: Display, cfg: GameConfig) -> None:
     display.send("Select a colour:\n1 = White/First\n2 = Black/Second\n3 = Random")
     link.sendtoboard("PlayerColor")
     while True:
-        msg = link.getboard()
-        if msg is None:
-            continue
+        msg = link.getboard(block=True)
         if msg.startswith("n"):
             raise GoToModeSelect()
         side = parse_side_choice(msg)
@@ -285,23 +421,17 @@ def setup_local(link: BoardLink, display: Display, cfg: GameConfig) -> None:
 
     """
     display.send("Choose computer\ndifficulty level:\n(0 -> 8)")
-    link.sendtoboard("EngineStrength")
-    link.sendtoboard(f"default_strength_{cfg.skill_level}")
+    link.sendtoboard_many(["EngineStrength", f"default_strength_{cfg.skill_level}"])
     while True:
-        msg = link.getboard()
-        if msg is None:
-            continue
+        msg = link.getboard(block=True)
         if msg.isdigit():
             cfg.skill_level = max(0, min(int(msg), 20))
             break
 
     display.send("Choose computer\nmove time:\n(0 -> 8)")
-    link.sendtoboard("TimeControl")
-    link.sendtoboard(f"default_time_{cfg.move_time_ms}")
+    link.sendtoboard_many(["TimeControl", f"default_time_{cfg.move_time_ms}"])
     while True:
-        msg = link.getboard()
-        if msg is None:
-            continue
+        msg = link.getboard(block=True)
         if msg.isdigit():
             cfg.move_time_ms = max(10, int(msg))
             break
@@ -319,33 +449,103 @@ def ui_engine_thinking(display: Display):
     display.send("Engine Thinking...")
 
 
+def is_engine_turn(brd: chess.Board, mode: str, cfg: GameConfig) -> bool:
+    return mode == "stockfish" and brd.turn != cfg.human_is_white
+
+
+def push_and_update(state: RuntimeState, move: chess.Move, cfg: GameConfig) -> None:
+    """Push 'move' and refresh the per-turn flags on 'state'."""
+    state.board.push(move)
+    state.zkey = state.board._transposition_key()
+    # Repetition/75-move checks walk the move stack: do them once per push.
+    state.game_over = is_game_over_fast(state.board)
+
+
 def handoff_next_turn(
     link: BoardLink,
     display: Display,
     brd: chess.Board,
     mode: str,
-    cfg: GameConfig,
+    cfg: Optional[GameConfig],
     last_uci: str,
+    engine_to_move: Optional[bool] = None,
 ):
-    print(brd)
+    """
+    Tell the Pico/LCD whose turn it is after 'last_uci'. Callers that know
+    the answer pass engine_to_move; otherwise it is derived from mode/cfg.
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("%s", brd.fen())
 
-    human_to_move = mode == "local" or (
-        mode == "stockfish"
-        and (
-            (brd.turn == chess.WHITE and cfg.human_is_white)
-            or (brd.turn == chess.BLACK and not cfg.human_is_white)
+    if engine_to_move is None:
+        human_to_move = mode == "local" or (
+            mode == "stockfish" and brd.turn == cfg.human_is_white
         )
-    )
+    else:
+        human_to_move = not engine_to_move
     if human_to_move:
-        link.sendtoboard(f"turn_{'white' if brd.turn == chess.WHITE else 'black'}")
+        link.sendtoboard(TURN_MSG[brd.turn])
         display.show_arrow(
             last_uci,
-            suffix=f"{'WHITE' if brd.turn == chess.WHITE else 'BLACK'} to move",
+            suffix=f"{SIDE_NAME[brd.turn]} to move",
         )
     else:
         display.show_arrow(last_uci, suffix="ENGINE thinking")
 
 
+# Stockfish searches run here so the UART keeps being served meanwhile.
+# One worker: the engine handles a single search at a time anyway.
+_ENGINE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine")
+
+
+def search_while_serving(
+    link: BoardLink, display: Display, brd: chess.Board, search, *args
+) -> Optional[str]:
+    """
+    Run search(*args) on the engine thread. Until it returns, typing
+    previews and capture probes (against 'brd') are answered here; any
+    other payload is handed back to the link for the caller's loop once
+    the move is in.
+    """
+    woke = threading.Event()
+
+    def on_done(_f):
+        link.wake()
+        woke.set()
+
+    fut = _ENGINE_POOL.submit(search, *args)
+    # Wakes the select() below the moment the search is done
+    fut.add_done_callback(on_done)
+    held = []
+    while not fut.done():
+        # Sleep until the Pico sends something, the engine finishes, or a
+        # parked preview frame is due.
+        if not link.wait_readable(display.flush_pending()):
+            continue
+        msg = link.getboard_nonblocking_bytes()
+        if msg is None:
+            continue
+        if msg.startswith(b"typing_"):
+            handle_typing_preview(
+                display, msg[7:].decode("utf-8", "replace"), throttle=True
+            )
+        elif msg.startswith(b"capq_"):
+            cap = compute_capture_preview(
+                brd, msg[5:].strip().decode("ascii", "replace")
+            )
+            link.sendtoboard(f"capr_{1 if cap else 0}")
+        else:
+            held.append(msg)
+    # The future resolves before its callback runs, so the wake-up can land
+    # after the loop has exited: wait for it and drop it, or the caller's
+    # next wait ends at once.
+    woke.wait()
+    link.clear_wake()
+    if held:
+        link.unread(held)
+    return fut.result()
+
+
 def engine_move_and_send(
     link: BoardLink,
     display: Display,
@@ -353,46 +553,51 @@ def engine_move_and_send(
     state: RuntimeState,
     cfg: GameConfig,
 ):
-    reply = engine_bestmove(ctx, state.board, cfg.move_time_ms)
+    def search(ctx: EngineContext, brd: chess.Board, ms: int) -> Optional[str]:
+        return search_while_serving(link, display, brd, engine_bestmove, ctx, brd, ms)
+
+    key = (state.zkey, cfg.skill_level, cfg.move_time_ms)
+    reply = cached_engine_move(ctx, key, search, ctx, state.board, cfg.move_time_ms)
     if reply is None:
         return
 
     # Compute capture BEFORE pushing
-    mv = chess.Move.from_uci(reply)
+    mv = parse_uci_cached(reply)
     is_cap = state.board.is_capture(mv)
 
     # Send with _cap if capture, then push
     link.sendtoboard(f"m{reply}{'_cap' if is_cap else ''}")
-    state.board.push(mv)
+    push_and_update(state, mv, cfg)
 
-    if state.board.is_game_over():
-        _res = report_game_over(link, display, state.board)
-        while True:
-            msg2 = link.getboard()
-            if msg2 is None:
-                continue
-            if msg2 in ("n", "new", "in", "newgame", "btn_new"):
-                raise GoToModeSelect()
-            if msg2.startswith("typing_") or msg2 in ("hint", "btn_hint"):
-                continue
+    if state.game_over:
+        _res = report_game_over(link, display, state.board, ctx)
+        game_over_wait_ok_and_ack(link)
         # no handoff needed because game ended
     else:
         handoff_next_turn(link, display, state.board, state.mode, cfg, reply)
 
 
+_WINNER_TEXT = {"1-0": "White wins", "0-1": "Black wins"}
+
+
 def winner_text_from_result(res: str) -> str:
-    res = (res or "").strip()
-    if res == "1-0":
-        return "White wins"
-    if res == "0-1":
-        return "Black wins"
-    return "Draw"
+    return _WINNER_TEXT.get((res or "").strip(), "Draw")
 
 
 # -------------------- Typing preview --------------------
 
 
-def handle_typing_preview(display: Display, payload: str) -> None:
+# label -> (text before, text after) the typed squares
+_PREVIEW_FRAMES = {
+    "from": ("Enter from:\n", ""),
+    "to": ("Enter to:\n", ""),
+    "confirm": ("Confirm move:\n", "\nPress OK or re-enter"),
+}
+
+
+def handle_typing_preview(
+    display: Display, payload: str, throttle: bool = False
+) -> None:
     """
     payload is the '<after heypityping_...>' part, e.g.:
       'from_e'
@@ -400,32 +605,37 @@ def handle_typing_preview(display: Display, payload: str) -> None:
       'confirm_e2 → e4'
     Displays short contextual prompts.
     """
-    try:
-        # label, text
-        parts = payload.split("_", 1)
-        if len(parts) != 2:
-            return
-        label, text = parts[0], parts[1]
-        label = label.lower()
-        if label == "from":
-            display.send("Enter from:\n" + text)
-        elif label == "to":
-            display.send("Enter to:\n" + text)
-        elif label == "confirm":
-            display.send("Confirm move:\n" + text + "\nPress OK or re-enter")
-    except Exception:
-        # swallow malformed previews quietly
-        pass
+    # label, text (BoardLink payloads are already lower-case)
+    label, sep, text = payload.partition("_")
+    frame = _PREVIEW_FRAMES.get(label) if sep else None
+    if frame is None:
+        # Malformed previews are ignored quietly
+        return
+    head, tail = frame
+    if throttle:
+        # Caller flushes display.flush_pending(): frames arriving faster
+        # than they can be read are skipped, the last one is still drawn.
+        display.send_throttled(head + text + tail)
+    else:
+        display.send(head + text + tail)
 
 
 # -------------------- Human move processing (extracted) --------------------
 
 
 def process_human_move(
-    *, link: BoardLink, display: Display, board: chess.Board, uci: str
-) -> None:
+    *,
+    link: BoardLink,
+    display: Display,
+    board: chess.Board,
+    uci: str,
+    ctx: Optional[EngineContext] = None,
+    zkey: Optional[tuple] = None,
+) -> Optional[bool]:
     """Validate, handle promotion, push, and report/handoff.
 
+    Returns None if the move was rejected, else whether it ended the game.
+
     Extracted from the previous monolithic play loop to make the core loop
     easier to read and extend (Lichess later).
 
@@ -437,60 +647,36 @@ def process_human_move(
 
     # 1) Parse UCI
     try:
-        move = chess.Move.from_uci(uci)
+        move = parse_uci_cached(uci)
     except ValueError:
         link.sendtoboard(f"error_invalid_{uci}")
         display.show_invalid(uci)
-        return
+        return None
 
-    # 2) Promotion pre-detection if user did not include promotion letter
-    if len(uci) == 4:
-        try:
-            from_sq = uci[:2]
-            to_sq = uci[2:4]
-            piece = board.piece_at(chess.parse_square(from_sq))
-            if piece and piece.piece_type == chess.PAWN:
-                rank = int(to_sq[1])
-                if (piece.color == chess.WHITE and rank == 8) or (
-                    piece.color == chess.BLACK and rank == 1
-                ):
-                    promo = ask_promotion_piece(link, display)
-                    uci = uci + promo
-                    move = chess.Move.from_uci(uci)
-        except GoToModeSelect:
-            raise
-        except Exception:
-            # fall through to normal validation
-            pass
-
-    # 3) If still requires promotion (legal but missing promotion)
-    if requires_promotion(move, board):
+    # 2) Pawn reaching the last rank without a promotion letter: ask for one
+    if requires_promotion(move, board, zkey):
         promo = ask_promotion_piece(link, display)
         uci = uci + promo
-        try:
-            move = chess.Move.from_uci(uci)
-        except ValueError:
-            link.sendtoboard(f"error_invalid_{uci}")
-            display.show_invalid(uci)
-            return
+        move = with_promotion(move, promo)
 
-    # 4) Legality check
-    if move not in board.legal_moves:
+    # 3) Legality check
+    if not is_legal_fast(board, move, zkey):
         link.sendtoboard(f"error_illegal_{uci}")
         display.show_illegal(uci, side_name_from_board(board))
-        return
+        return None
 
-    # 5) Push
+    # 4) Push
     board.push(move)
 
-    # 6) Game over or handoff
-    if board.is_game_over():
-        report_game_over(link, display, board)
-        return
+    # 5) Game over or handoff
+    if is_game_over_fast(board):
+        report_game_over(link, display, board, ctx)
+        return True
 
-    # Keep your existing "arrow + whose turn" messaging
-    dummy_cfg = GameConfig(skill_level=5, move_time_ms=2000, human_is_white=True)
-    handoff_next_turn(link, display, board, "stockfish", dummy_cfg, uci)
+    # Keep your existing "arrow + whose turn" messaging. Only used against
+    # the engine, so after the human's move it is always the engine's turn.
+    handoff_next_turn(link, display, board, "stockfish", None, uci, engine_to_move=True)
+    return False
 
 
 # -------------------- Unified play loop --------------------
@@ -504,7 +690,10 @@ def play_game(
     cfg: GameConfig,
 ) -> None:
     # Reset and banner
-    state.board = chess.Board()
+    state.reset_board()
+    board = state.board
+    reset_game_caches()
+    state.game_over = False
     link.sendtoboard("GameStart")
     ui_new_game_banner(display)
     time.sleep(0.3)
@@ -523,145 +712,133 @@ def play_game(
         link.sendtoboard("turn_white")
         display.prompt_move("WHITE")
 
+    # Hot-loop bindings. Pico payloads stay bytes until a move has to be
+    # parsed or text shown, so control tokens and preview bursts never pay
+    # for a decode.
+    send = link.sendtoboard
+    getb = link.getboard_bytes
+    drain = link.drain_nonblocking_bytes
+    wait = link.wait_readable
+
+    # Preview/probe taken by the blocking read; handled with the next batch
+    pending = None
+
     while True:
-        # 1) Non-blocking: show typing previews if any
-        peek = link.getboard_nonblocking()
-        if peek is not None:
-            if peek == "shutdown":
+        # 1) Non-blocking: handle everything the Pico has already queued
+        batch = drain()
+        if pending is not None:
+            batch.insert(0, pending)
+            pending = None
+        preview = None
+        for i, peek in enumerate(batch):
+            if peek == b"shutdown":
                 shutdown_pi(link, display)
                 return
-            if peek.startswith("typing_"):
-                handle_typing_preview(display, peek[len("typing_") :])
+            if peek.startswith(b"typing_"):
+                # later previews supersede earlier ones; draw only the newest
+                preview = peek
+            elif peek.startswith(b"capq_"):
+                # Pico asks: "capq_<uci>" -> answer quickly with "capr_0/1".
+                # One reply per probe, as GameController does: the Pico
+                # pairs them up.
+                cap = compute_capture_preview(
+                    board, peek[5:].strip().decode("ascii", "replace")
+                )
+                send(f"capr_{1 if cap else 0}")
+            else:
+                # Moves and control tokens: hand this one and everything
+                # after it back, in order, for the dispatcher in step 3.
+                link.unread(batch[i:])
+                break
+
+        if preview is not None:
+            handle_typing_preview(
+                display, preview[7:].decode("utf-8", "replace"), throttle=True
+            )
             # do not 'continue' to still allow engine turn same cycle
 
-            # Pico asks: "capq_<uci>" -> answer quickly with "capr_0/1"
-            if peek.startswith("capq_"):
-                uci = peek[5:].strip()
-                try:
-                    cap = compute_capture_preview(state.board, uci)
-                except Exception:
-                    cap = False
-                link.sendtoboard(f"capr_{1 if cap else 0}")
-
         # 2) Engine turn (Stockfish mode)
-        if state.mode == "stockfish" and not state.board.is_game_over():
-            engine_should_move = (
-                state.board.turn == chess.WHITE and not cfg.human_is_white
-            ) or (state.board.turn == chess.BLACK and cfg.human_is_white)
-            if engine_should_move:
-                ui_engine_thinking(display)
-                engine_move_and_send(link, display, ctx, state, cfg)
-                # After engine move, loop continues to check for human input
-                continue
-
-        # 3) Blocking read for next Pico message
-        msg = link.getboard()
-        if msg is None:
-            # serial timeout; loop to allow engine step or previews again
-            continue
-        if msg == "shutdown":
-            shutdown_pi(link, display)
-            return
-
-        # 4) Also handle typing previews in the blocking path (to be consistent)
-        if msg.startswith("typing_"):
-            handle_typing_preview(display, msg[len("typing_") :])
+        if not state.game_over and is_engine_turn(board, state.mode, cfg):
+            ui_engine_thinking(display)
+            engine_move_and_send(link, display, ctx, state, cfg)
+            # After engine move, loop continues to check for human input
             continue
 
-        # --- NEW: capture preview probe (blocking path) ---
-        if msg.startswith("capq_"):
-            uci = msg[5:].strip()
-            try:
-                cap = compute_capture_preview(state.board, uci)
-            except Exception:
-                cap = False
-            link.sendtoboard(f"capr_{1 if cap else 0}")
+        # 3) Blocking read for next Pico message. Whose turn it is only changes
+        # inside this loop, so there is nothing to poll for: sleep in select()
+        # until the Pico sends a line instead of waking on every serial timeout.
+        # A throttled preview may still be parked: sleep only until it is due.
+        due = display.flush_pending()
+        if due is not None and not wait(due):
             continue
+        msg = getb(block=True)
+        kind = TOKEN_KIND_B.get(msg, 0)
+        if kind:
+            # 4) Control tokens: one dict hit, no prefix scans
+            if kind == TK_SHUTDOWN:
+                shutdown_pi(link, display)
+                return
 
-        # 5) New game request
-        if msg in ("n", "new", "in", "newgame", "btn_new"):
-            raise GoToModeSelect()
+            # 5) New game request
+            if kind == TK_NEW:
+                raise GoToModeSelect()
 
-        # 6) Hint request
-        if msg in ("hint", "btn_hint"):
-            send_hint_to_board(link, display, ctx, state, cfg)
-            continue
+            # 6) Hint request
+            if kind == TK_HINT:
+                send_hint_to_board(link, display, ctx, state, cfg)
+                continue
 
-        # 7) OK acknowledgement / 'enter move' trigger (Pico sends this before typing_ begins)
-        if msg in ("ok", "btnok", "btn_ok"):
-            # Keep OLED aligned with Pico's UX: OK takes you to the move entry prompt.
-            display.prompt_move("WHITE" if state.board.turn == chess.WHITE else "BLACK")
-            continue
+            # 7) OK acknowledgement / 'enter move' trigger (Pico sends this before typing_ begins)
+            if kind == TK_OK:
+                # Keep OLED aligned with Pico's UX: OK takes you to the move entry prompt.
+                display.prompt_move(SIDE_NAME[board.turn])
+                continue
+        else:
+            # Typing previews and capture probes usually arrive in bursts:
+            # hand this one to step 1 with whatever followed it, so a run of
+            # previews only draws its newest frame.
+            if msg.startswith(b"typing_") or msg.startswith(b"capq_"):
+                pending = msg
+                continue
 
         # 7) Try parsing a move
+        msg = msg.decode("utf-8", "replace")
         uci = parse_move_payload(msg)
         if not uci:
-            link.sendtoboard(f"error_invalid_{msg}")
+            send(f"error_invalid_{msg}")
             display.show_invalid(msg)
             continue
 
-        # === PROMOTION PRE-DETECTION ===
-        # If the pawn move ends on rank 8 (white) or rank 1 (black),
-        # and the UCI has no promotion letter, trigger promotion.
-        from_sq = uci[:2]
-        to_sq = uci[2:4]
-
-        if len(uci) == 4:
-            # we need board state BEFORE including this move
-            piece = state.board.piece_at(chess.parse_square(from_sq))
-            if piece and piece.piece_type == chess.PAWN:
-                rank = int(to_sq[1])
-                if (piece.color == chess.WHITE and rank == 8) or (
-                    piece.color == chess.BLACK and rank == 1
-                ):
-                    # ask promotion piece BEFORE creating the move
-                    promo = ask_promotion_piece(link, display)
-                    uci = uci + promo
-
         # 8) Validate UCI and handle promotion if needed
         try:
-            move = chess.Move.from_uci(uci)
+            move = parse_uci_cached(uci)
         except ValueError:
-            link.sendtoboard(f"error_invalid_{uci}")
+            send(f"error_invalid_{uci}")
             display.show_invalid(uci)
             continue
 
-        # Promotion needed?
-        if requires_promotion(move, state.board):
+        # Promotion needed? (pawn to the last rank, no letter given)
+        if requires_promotion(move, board, state.zkey):
             promo = ask_promotion_piece(link, display)
             uci = uci + promo
-            try:
-                move = chess.Move.from_uci(uci)
-            except ValueError:
-                link.sendtoboard(f"error_invalid_{uci}")
-                display.show_invalid(uci)
-                continue
+            move = with_promotion(move, promo)
 
         # 9) Legality check (AFTER OK) — Pico only sends after OK now
-        if move not in state.board.legal_moves:
-            link.sendtoboard(f"error_illegal_{uci}")
-            display.show_illegal(uci, side_name_from_board(state.board))
+        if not is_legal_fast(board, move, state.zkey):
+            send(f"error_illegal_{uci}")
+            display.show_illegal(uci, side_name_from_board(board))
             continue
 
         # 10) Accept and push
-        state.board.push(move)
+        push_and_update(state, move, cfg)
 
         # 11) Game over?
-        if state.board.is_game_over():
-            _res = report_game_over(link, display, state.board)
+        if state.game_over:
+            _res = report_game_over(link, display, board, ctx)
             # Wait for Pico to acknowledge by sending 'n' (OK)
-            while True:
-                msg2 = link.getboard()
-                if msg2 is None:
-                    continue
-                if msg2 in ("n", "new", "in", "newgame", "btn_new"):
-                    # Return to mode select
-                    raise GoToModeSelect()
-                # swallow typing/hint during game over
-                if msg2.startswith("typing_") or msg2 in ("hint", "btn_hint"):
-                    continue
+            game_over_wait_ok_and_ack(link)
         else:
-            handoff_next_turn(link, display, state.board, state.mode, cfg, uci)
+            handoff_next_turn(link, display, board, state.mode, cfg, uci)
 
 
 # -------------------- Online placeholder --------------------
@@ -695,6 +872,10 @@ def run_puzzle_mode(link: BoardLink, display: Display) -> None:
 
     Fetches the daily puzzle and validates moves locally.
     """
+    # Imported here so startup does not pay for requests/PGN parsing.
+    from app.lichess_client import LichessClient
+    from app.puzzle_controller import DailyPuzzleController
+
     client = LichessClient()
     DailyPuzzleController(client).run(link, display)
 
@@ -706,6 +887,8 @@ def mode_dispatch(
     state: RuntimeState,
     cfg: GameConfig,
 ) -> None:
+    # Whatever the last game left pondering has nothing to do with this one
+    ctx.stop_ponder()
     if state.mode == "stockfish":
         setup_stockfish(link, display, cfg)
         link.sendtoboard("SetupComplete")
@@ -714,11 +897,11 @@ def mode_dispatch(
         from app.stockfish_opponent import StockfishOpponent
 
         opponent = StockfishOpponent(
-    ctx,
-    move_time_ms=cfg.move_time_ms,
-    skill_level=cfg.skill_level,
-    use_elo=False,   # <-- turn on Elo limiting
-)
+            ctx,
+            move_time_ms=cfg.move_time_ms,
+            skill_level=cfg.skill_level,
+            use_elo=False,  # <-- turn on Elo limiting
+        )
         controller = GameController(
             LoopDeps(link=link, display=display, opponent=opponent),
             human_is_white=cfg.human_is_white,
@@ -745,6 +928,8 @@ def shutdown_pi(link: BoardLink, display: Display) -> None:
         display.send("Shutting down...\nWait 20s then\ndisconnect power.")
     time.sleep(2)
     try:
+        import subprocess
+
         subprocess.call("sudo nohup shutdown -h now", shell=True)
     except Exception as e:
         print(f"[Shutdown] {e}", file=sys.stderr)
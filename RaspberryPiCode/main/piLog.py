@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Logging for SmarterChess (modular version).
+- Records are queued by the caller and written to stdout (the journal
+  under systemd) by a listener thread, so the UART/game loop never waits
+  on a log write.
+- Level comes from SMARTCHESS_LOG_LEVEL (default INFO).
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_LEVEL: str = os.environ.get("SMARTCHESS_LOG_LEVEL", "INFO").upper()
+
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    global _listener
+    if _listener is None:
+        q: queue.SimpleQueue = queue.SimpleQueue()
+        out = logging.StreamHandler(sys.stdout)
+        out.setFormatter(logging.Formatter("%(message)s"))
+        _listener = logging.handlers.QueueListener(q, out)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger("smartchess")
+        root.addHandler(logging.handlers.QueueHandler(q))
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+    return logging.getLogger(f"smartchess.{name}")
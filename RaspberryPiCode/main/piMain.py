@@ -14,6 +14,7 @@ Behavior parity with single-file version:
   - Legality validated after OK on Pi
   - Typing previews shown non-blocking and blocking
 """
+import threading
 import time
 import traceback
 
@@ -21,55 +22,95 @@ import traceback
 # RaspberryPiCode/main under systemd.
 import os
 import sys
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from piDisplay import Display
 from piSerial import BoardLink
 from piEngine import EngineContext
+from piChessBackend import Board
 from piGame import GameConfig, RuntimeState, select_mode, mode_dispatch, GoToModeSelect
-import chess  # type: ignore
 
+# systemd readiness (Type=notify). python-systemd if installed, else the
+# datagram protocol by hand; a no-op when not started by systemd.
+try:
+    from systemd.daemon import notify as sd_notify  # type: ignore
+except ImportError:
+    import socket
+
+    def sd_notify(state: str) -> bool:
+        addr = os.environ.get("NOTIFY_SOCKET")
+        if not addr:
+            return False
+        if addr[0] == "@":
+            addr = "\0" + addr[1:]  # abstract namespace
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.sendto(state.encode("utf-8"), addr)
+            return True
+        except OSError:
+            return False
 
 
 def main():
+    # Engine pre-warm runs while the display server starts and the splash
+    # is up: spawning Stockfish and the UCI handshake need neither.
+    ctx = EngineContext()
+    warm = threading.Thread(
+        target=ctx.ensure, args=("/usr/games/stockfish",), daemon=True
+    )
+    warm.start()
+
     display = Display()
     display.restart_server()
     display.wait_ready()
 
-    # Splash + engine pre-warm before we open UART / ask for mode
-    display.banner("SMARTCHESS", delay_s=1.2)   # splash
-    display.send("Engine starting...")          # status line prior to mode select
-
-    ctx = EngineContext()
-    # Synchronous pre-warm: blocks until stockfish is ready with your current ensure()
-    # If stockfish may not be installed, consider Option B below.
-    ctx.ensure("/usr/games/stockfish")
+    # Splash before we open UART / ask for mode
+    display.banner("SMARTCHESS", delay_s=1.2)  # splash
 
     link = BoardLink()
+
+    # Blocks until stockfish is ready (ensure() retries until it starts)
+    if warm.is_alive():
+        display.send("Engine starting...")  # status line prior to mode select
+        warm.join()
+    # Engine up and UART open: only now is the service actually usable
+    sd_notify("READY=1")
+
     cfg = GameConfig()
-    state = RuntimeState(board=chess.Board(), mode="stockfish")
+    state = RuntimeState(board=Board(), mode="stockfish")
+
+    # Useful for testing modes not yet selectable from the Pico UI. Read
+    # once: the environment does not change after start.
+    forced = (os.environ.get("SMARTCHESS_FORCE_MODE") or "").strip().lower()
 
     while True:
         try:
-            forced = (os.environ.get("SMARTCHESS_FORCE_MODE") or "").strip().lower()
             if forced:
-                # Useful for testing modes not yet selectable from the Pico UI.
                 state.mode = forced
                 display.send(f"Mode forced:\n{forced}")
                 time.sleep(1.0)
             else:
+                sd_notify("STATUS=waiting for mode select")
                 selected = select_mode(link, display, state)
                 state.mode = selected
             mode_dispatch(link, display, ctx, state, cfg)
         except GoToModeSelect:
-            state.board = chess.Board()
+            # Back at the menu: stop any background search on the old game
+            ctx.stop_ponder()
+            state.reset_board()
             display.send("SMARTCHESS")
-            time.sleep(2.5)
+            # Keep the banner up, but let a board message cut it short; the
+            # line stays buffered for select_mode() to read.
+            link.wait_readable(2.5)
             continue
         except KeyboardInterrupt:
             break
         except Exception:
             traceback.print_exc()
+            # If the failure took Stockfish down, respawn it now rather than
+            # on the next search; a no-op while it is still running.
+            ctx.ensure("/usr/games/stockfish")
             time.sleep(1)
             continue
 
@@ -82,5 +123,6 @@ def main():
     except Exception:
         pass
 
+
 if __name__ == "__main__":
     main()
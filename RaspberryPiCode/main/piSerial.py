@@ -3,74 +3,251 @@
 Serial link wrapper for Pico <-> Pi protocol (modular version)
 - Preserves UART protocol strings (heyArduino / heypi / heypixshutdown).
 """
-from typing import Optional
+from collections import deque
+from typing import Deque, List, Optional
+import logging
+import os
+import selectors
+import time
 import serial  # type: ignore
 
+from piLog import get_logger
+
+log = get_logger("serial")
+
 SERIAL_PORT: str = "/dev/serial0"
 BAUD: int = 115200
 SERIAL_TIMEOUT: float = 2.0
 
+_FRAMES_MAX = 128
+_PREFIX = b"heyArduino"
+_READ_CHUNK = 4096
+
+
 class BoardLink:
-    def __init__(self, port: str = SERIAL_PORT, baud: int = BAUD, timeout: float = SERIAL_TIMEOUT):
+    def __init__(
+        self, port: str = SERIAL_PORT, baud: int = BAUD, timeout: float = SERIAL_TIMEOUT
+    ):
         self.ser = serial.Serial(port, baud, timeout=timeout)
         self.ser.flush()
+        # Lines are framed here from bulk reads; pyserial's readline() costs
+        # a select()+read() pair per byte.
+        self._buf = bytearray()
+        # Bytes of _buf already searched for a newline (or the newline's
+        # index once found), so a long partial line is scanned only once.
+        self._scan = 0
+        self._sel = selectors.DefaultSelector()
+        self._fd = self.ser.fileno()
+        self._sel.register(self._fd, selectors.EVENT_READ)
+        # Self-pipe so another thread can cut a wait_readable() short
+        # (e.g. the engine finishing) instead of it polling in slices.
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ)
+        # Payloads handed back with unread(); served before the UART.
+        self._held: Deque[bytes] = deque()
+        # text -> framed b"heyArduino<text>\n". Turn/ack/prompt messages
+        # repeat all game; the first _FRAMES_MAX distinct ones are kept.
+        self._frames: dict = {}
+
+    def fileno(self) -> int:
+        return self.ser.fileno()
 
     def close(self):
         try:
+            self._sel.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
             self.ser.close()
         except Exception:
             pass
 
-    # Writes 
+    def wake(self) -> None:
+        """Make a wait_readable() in progress return now. Thread-safe."""
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def clear_wake(self) -> None:
+        """Discard wake-ups nobody waited for, so they cannot cut a later wait short."""
+        try:
+            while os.read(self._wake_r, 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    # Writes
     def send_raw(self, text: str) -> None:
         self.ser.write(text.encode("utf-8") + b"\n")
 
+    def _frame(self, text: str) -> bytes:
+        frame = self._frames.get(text)
+        if frame is None:
+            frame = b"".join((_PREFIX, text.encode("utf-8"), b"\n"))
+            if len(self._frames) < _FRAMES_MAX:
+                self._frames[text] = frame
+        return frame
+
     def sendtoboard(self, text: str) -> None:
-        payload = "heyArduino" + text
-        self.ser.write(payload.encode("utf-8") + b"\n")
-        print(f"[-→Board] {payload}")
+        self.ser.write(self._frame(text))
+        log.debug("[-→Board] heyArduino%s", text)
+
+    def sendtoboard_many(self, texts: List[str]) -> None:
+        """Send back-to-back messages in a single write (same frames on the wire)."""
+        self.ser.write(b"".join([self._frame(t) for t in texts]))
+        for text in texts:
+            log.debug("[-→Board] heyArduino%s", text)
+
+    def unread(self, payloads: List[bytes]) -> None:
+        """Hand payloads back; the next reads return them first, in order."""
+        self._held.extendleft(reversed(payloads))
 
     # Reads
-    def _readline(self) -> Optional[str]:
-        line = self.ser.readline()
-        if not line:
-            return None
+    def _fill(self, selected: bool = False) -> None:
+        """
+        Move whatever the UART already holds into the line buffer. pyserial
+        keeps the port O_NONBLOCK, so this is one read() syscall instead of
+        in_waiting's ioctl plus Serial.read()'s select()/read() loop.
+        selected: select() just reported the port readable.
+        """
         try:
-            return line.decode("utf-8").strip()
-        except UnicodeDecodeError:
+            chunk = os.read(self._fd, _READ_CHUNK)
+        except BlockingIOError:
+            return
+        if not chunk:
+            # pyserial sets VMIN=0/VTIME=0, so an idle tty reads as b"".
+            # Only after select() said "readable" does empty mean the
+            # device went away (same check as pyserial).
+            if selected:
+                raise serial.SerialException(
+                    "device reports readiness to read but returned no data"
+                )
+            return
+        self._buf.extend(chunk)
+
+    def _find_nl(self) -> int:
+        """Index of the first newline in _buf, or -1."""
+        i = self._buf.find(b"\n", self._scan)
+        self._scan = len(self._buf) if i < 0 else i
+        return i
+
+    def _line_ready(self) -> bool:
+        if self._find_nl() >= 0:
+            return True
+        self._fill()
+        return self._find_nl() >= 0
+
+    def wait_readable(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sleep in select() until a whole line is buffered (None waits
+        forever). Returns False if the timeout ran out first or wake()
+        was called.
+        """
+        return bool(self._held) or self._wait_line(timeout, wakeable=True)
+
+    def _wait_line(self, timeout: Optional[float], wakeable: bool = False) -> bool:
+        if self._line_ready():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            # Sleep in the kernel until the Pico sends something
+            for key, _ in self._sel.select(remaining):
+                if key.fd == self._wake_r:
+                    self.clear_wake()
+                    if wakeable:
+                        return self._line_ready()
+                else:
+                    self._fill(selected=True)
+            if self._find_nl() >= 0:
+                return True
+
+    def _readline(self, block: bool = False) -> Optional[bytes]:
+        """
+        Next line, stripped and lower-cased; None on timeout. block=True
+        ignores the serial timeout and waits for the line.
+        """
+        if not self._wait_line(None if block else self.ser.timeout):
             return None
+        end = self._find_nl() + 1
+        line = bytes(self._buf[:end])
+        del self._buf[:end]
+        self._scan = 0
+        # The protocol is plain ASCII: bytes.lower() is a byte-table lookup,
+        # no per-codepoint work and no UTF-8 decode.
+        return line.strip().lower()
+
+    @staticmethod
+    def _payload(raw: bytes) -> Optional[bytes]:
+        """Strip the 'heypi' envelope; None for lines that are not ours."""
+        if raw.startswith(b"heypixshutdown"):
+            return b"shutdown"
+        if raw.startswith(b"heypi"):
+            payload = raw[5:]
+            # Per-frame trace: skip the decodes unless someone asked for it
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(
+                    "[Board→] %s  | payload='%s'",
+                    raw.decode("utf-8", "replace"),
+                    payload.decode("utf-8", "replace"),
+                )
+            return payload
+        return None
 
     def get_raw_from_board(self) -> Optional[str]:
         raw = self._readline()
         if raw is None:
             return None
-        low = raw.lower()
-        if low.startswith("heypixshutdown"):
+        if raw.startswith(b"heypixshutdown"):
             return "heypixshutdown"
-        return low
+        return raw.decode("utf-8", "replace")
 
-    def getboard_nonblocking(self) -> Optional[str]:
-        if self.ser.in_waiting:
+    def getboard_nonblocking_bytes(self) -> Optional[bytes]:
+        if self._held:
+            return self._held.popleft()
+        if self._line_ready():
             raw = self._readline()
-            if not raw:
-                return None
-            low = raw.lower()
-            if low.startswith("heypixshutdown"):
-                return "shutdown"
-            if low.startswith("heypi"):
-                payload = low[5:]
-                print(f"[Board→] {low}  | payload='{payload}'")
-                return payload
+            if raw:
+                return self._payload(raw)
         return None
 
-    def getboard(self) -> Optional[str]:
+    def getboard_nonblocking(self) -> Optional[str]:
+        payload = self.getboard_nonblocking_bytes()
+        return None if payload is None else payload.decode("utf-8", "replace")
+
+    def drain_nonblocking_bytes(self, max_n: int = 16) -> List[bytes]:
+        """Return every payload already buffered (up to max_n) without waiting."""
+        out: List[bytes] = []
+        while len(out) < max_n and (self._held or self._line_ready()):
+            payload = self.getboard_nonblocking_bytes()
+            if payload is not None:
+                out.append(payload)
+        return out
+
+    def drain_nonblocking(self, max_n: int = 16) -> List[str]:
+        return [
+            p.decode("utf-8", "replace") for p in self.drain_nonblocking_bytes(max_n)
+        ]
+
+    def getboard_bytes(self, block: bool = False) -> Optional[bytes]:
+        """
+        Blocking read of the next payload as lower-case ASCII bytes.
+        None after the serial timeout, unless block=True (then never None).
+        """
+        if self._held:
+            return self._held.popleft()
         while True:
-            raw = self.get_raw_from_board()
+            raw = self._readline(block)
             if raw is None:
                 return None
-            if raw.startswith("heypixshutdown"):
-                return "shutdown"
-            if raw.startswith("heypi"):
-                payload = raw[5:]
-                print(f"[Board→] {raw}  | payload='{payload}'")
-                return payload
\ No newline at end of file
+            payload = self._payload(raw)
+            if payload is not None:
+                return payload
+
+    def getboard(self, block: bool = False) -> Optional[str]:
+        payload = self.getboard_bytes(block)
+        return None if payload is None else payload.decode("utf-8", "replace")
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Shared LCD rendering helpers for the display server entrypoints.
+Call init_display() once before using any draw_* helper.
+"""
+import sys
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+
+# Waveshare ST7789 driver
+sys.path.append("/home/king/LCD_Module_RPI_code/RaspberryPi/python")
+from lib.LCD_1inch14 import LCD_1inch14
+
+FONT_PATH = "/home/king/LCD_Module_RPI_code/RaspberryPi/python/Font/Font00.ttf"
+SPLASH_CACHE = "/tmp/smartchess_splash.rgb"
+
+# Set by init_display()
+disp = None
+W, H = 0, 0
+FRAME = None
+# Area of FRAME the previous message drew into; only that is cleared
+LAST_BBOX = (0, 0, 0, 0)
+
+
+# ------------------------------------------------------
+# Display init / blit
+# ------------------------------------------------------
+def init_display(backlight: int = 80):
+    global disp, W, H, FRAME, LAST_BBOX
+    disp = LCD_1inch14()
+    disp.Init()
+    disp.bl_DutyCycle(backlight)
+    disp.clear()
+
+    # Screen constants
+    W, H = disp.width, disp.height
+    # Text is monochrome, so frames are drawn in 8-bit grayscale ("L") and only
+    # expanded to RGB for the driver at blit time. Every frame is redrawn
+    # into this one buffer instead of a fresh copy.
+    FRAME = Image.new("L", (W, H), 0)
+    LAST_BBOX = (0, 0, 0, 0)
+    return disp
+
+
+def blit(img):
+    """
+    Push a grayscale frame to the panel (driver expects RGB).
+    """
+    disp.ShowImage(img.convert("RGB"))
+
+
+# Font cache
+FONTS = {}
+
+
+def get_font(size: int):
+    if size not in FONTS:
+        FONTS[size] = ImageFont.truetype(FONT_PATH, size)
+    return FONTS[size]
+
+
+# Fixed sizes printToOLED.py asks for, plus the auto-fit range ends
+PRELOAD_SIZES = (14, 20, 22, 26, 28)
+
+
+def preload_fonts(sizes=PRELOAD_SIZES):
+    """
+    Parse the common TTF sizes up front so the first frame at each size
+    does not pay for it while someone is waiting on the screen.
+    """
+    for size in sizes:
+        get_font(size)
+
+
+# ------------------------------------------------------
+# AUTO FONT SCALING
+# ------------------------------------------------------
+# (size, line) -> advance width; the same prompts get measured at the
+# same few sizes on every redraw.
+_WIDTH_CACHE = {}
+_WIDTH_CACHE_MAX = 1024
+
+
+def _line_width(ln: str, size: int) -> int:
+    tile = LINE_CACHE.get((size, ln))
+    if tile is not None:
+        return tile[1]  # already rendered: its width is known
+    key = (size, ln)
+    w = _WIDTH_CACHE.get(key)
+    if w is None:
+        w = max(1, int(get_font(size).getlength(ln)))
+        if len(_WIDTH_CACHE) >= _WIDTH_CACHE_MAX:
+            _WIDTH_CACHE.clear()
+        _WIDTH_CACHE[key] = w
+    return w
+
+
+def _fits(lines, size: int, vpad: int, spacing: int) -> bool:
+    """
+    True if 'lines' at font 'size' fit inside the screen minus padding.
+    Measured the way draw_centered_text_with_size lays them out: one
+    ascent+descent pitch per line (blank ones included) plus spacing.
+    """
+    ascent, descent = get_font(size).getmetrics()
+    total_h = len(lines) * (ascent + descent + spacing) - spacing
+    max_w = max((_line_width(ln, size) for ln in lines if ln), default=0)
+
+    return total_h <= (H - 2 * vpad) and max_w <= (W - 2 * vpad)
+
+
+# (lines, min_size, max_size, vpad, spacing) -> (size, spacing); steady
+# screens ("Enter move:" etc.) skip the search entirely.
+AUTOSIZE_CACHE = {}
+AUTOSIZE_CACHE_MAX = 256
+
+
+def find_best_font_size(lines, min_size=14, max_size=28, vpad=4, spacing=6):
+    """
+    Choose the largest font size that fits both width and height with given padding & spacing.
+    Fit is monotonic in size, so binary search instead of scanning every size.
+    Returns: (size, spacing)
+    """
+    key = (tuple(lines), min_size, max_size, vpad, spacing)
+    hit = AUTOSIZE_CACHE.get(key)
+    if hit is not None:
+        return hit
+
+    lo, hi = min_size, max_size
+    best = min_size  # fallback
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if _fits(lines, mid, vpad, spacing):
+            best = mid
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    if len(AUTOSIZE_CACHE) >= AUTOSIZE_CACHE_MAX:
+        AUTOSIZE_CACHE.clear()
+    AUTOSIZE_CACHE[key] = (best, spacing)
+    return best, spacing
+
+
+# ------------------------------------------------------
+# Rendered line tiles
+# ------------------------------------------------------
+# (size, text) -> (tile, w, h). Most updates change one line (typing
+# previews) or none, so the other lines are pasted, not re-rasterized.
+LINE_CACHE = OrderedDict()
+LINE_CACHE_MAX = 128
+
+
+def render_line(size: int, text: str):
+    """
+    Grayscale tile of one line: full ascent+descent height so lines of a
+    block share a baseline pitch, width = advance width.
+    """
+    key = (size, text)
+    hit = LINE_CACHE.get(key)
+    if hit is not None:
+        LINE_CACHE.move_to_end(key)
+        return hit
+
+    font = get_font(size)
+    ascent, descent = font.getmetrics()
+    w = max(1, int(font.getlength(text)))
+    h = ascent + descent
+    tile = Image.new("L", (w, h), 0)
+    ImageDraw.Draw(tile).text((0, 0), text, font=font, fill=255)
+
+    hit = LINE_CACHE[key] = (tile, w, h)
+    if len(LINE_CACHE) > LINE_CACHE_MAX:
+        LINE_CACHE.popitem(last=False)
+    return hit
+
+
+# ------------------------------------------------------
+# Draw centered text with explicit size/spacing
+# ------------------------------------------------------
+def draw_centered_text_with_size(lines, size: int, spacing: int = 6, vpad: int = 0):
+    """
+    Draw 'lines' using font 'size' and 'spacing', centered on screen.
+    Each line is a cached tile pasted into the frame; only the area the
+    previous message used is cleared first.
+    """
+    global LAST_BBOX
+    FRAME.paste(0, LAST_BBOX)
+
+    ascent, descent = get_font(size).getmetrics()
+    pitch = ascent + descent + spacing
+    y = (H - (pitch * len(lines) - spacing)) // 2
+    x0, y0, x1, y1 = W, H, 0, 0
+    for ln in lines:
+        if ln:
+            tile, w, h = render_line(size, ln)
+            x = (W - w) // 2
+            FRAME.paste(tile, (x, y))
+            x0, y0 = min(x0, x), min(y0, y)
+            x1, y1 = max(x1, x + w), max(y1, y + h)
+        y += pitch
+
+    # Clipped to the screen; empty when nothing was drawn
+    LAST_BBOX = (max(x0, 0), max(y0, 0), min(max(x1, x0), W), min(max(y1, y0), H))
+    blit(FRAME)
+
+
+def draw_centered_text_auto(lines, min_size=14, max_size=28, vpad=4, spacing=6):
+    """
+    Autosize to fit, then render centered.
+    """
+    size, sp = find_best_font_size(
+        lines, min_size=min_size, max_size=max_size, vpad=vpad, spacing=spacing
+    )
+    draw_centered_text_with_size(lines, size=size, spacing=sp, vpad=vpad)
+
+
+# ------------------------------------------------------
+# Splash screen
+# ------------------------------------------------------
+def draw_splash():
+    """
+    The splash never changes: its RGB frame is saved after the first render
+    and later starts blit the raw bytes without touching FreeType.
+    """
+    global LAST_BBOX
+    try:
+        with open(SPLASH_CACHE, "rb") as f:
+            frame = Image.frombytes("RGB", (W, H), f.read())
+    except (OSError, ValueError):
+        FRAME.paste(0, LAST_BBOX)
+        draw = ImageDraw.Draw(FRAME)
+        # pick a size that looks good on 1.14"
+        font = get_font(28)
+
+        draw.text((W // 2, H // 2 - 10), "SMARTCHESS", font=font, fill=255, anchor="mm")
+        LAST_BBOX = (0, 0, W, H)
+
+        frame = FRAME.convert("RGB")
+        try:
+            with open(SPLASH_CACHE, "wb") as f:
+                f.write(frame.tobytes())
+        except OSError:
+            pass
+
+    disp.ShowImage(frame)
+
+
+# ------------------------------------------------------
+# Message rendering
+# ------------------------------------------------------
+def render_message(line: bytes):
+    """
+    Parse one pipe message "L1|L2|L3|L4|size" and draw it.
+    """
+    parts = line.strip().split(b"|")
+    if not parts:
+        return
+
+    raw_size = parts[-1].strip() if parts[-1] else b"auto"
+    # Support up to 4 lines; ignore extras gracefully
+    lines = [p.decode("utf-8", "replace") for p in parts[:-1]]
+
+    # Normalize trailing empty lines (optional)
+    # while lines and lines[-1] == "":
+    #     lines.pop()
+
+    # Decide between fixed size or auto
+    try:
+        if raw_size.lower() == b"auto":
+            draw_centered_text_auto(lines)
+        else:
+            size = int(raw_size)
+            draw_centered_text_with_size(lines, size=size, spacing=6)
+    except Exception:
+        # Fallback to safe auto on any parse/draw error
+        draw_centered_text_auto(lines)
@@ -1,26 +1,23 @@
 #!/usr/bin/env python3
-import sys, getopt
+import sys
 
 PIPE = "/tmp/lcdpipe"
 
-text1 = text2 = text3 = text4 = ""
-forced_size = None
+# Always "-a x -b y ...": pair flags with values directly, no getopt import
+opts = {}
+argv = iter(sys.argv[1:])
+for tok in argv:
+    opts[tok] = next(argv, "")
+
+text1 = opts.get("-a", "")
+text2 = opts.get("-b", "")
+text3 = opts.get("-c", "")
+text4 = opts.get("-d", "")
 
-opts, args = getopt.getopt(sys.argv[1:], "ha:b:c:d:s:")
-
-for opt, arg in opts:
-    if opt == "-a":
-        text1 = arg
-    elif opt == "-b":
-        text2 = arg
-    elif opt == "-c":
-        text3 = arg
-    elif opt == "-d":
-        text4 = arg
-    elif opt == "-s":
-        cleaned = arg.strip()
-        if cleaned.isdigit():
-            forced_size = int(cleaned)
+forced_size = None
+cleaned = opts.get("-s", "").strip()
+if cleaned.isdigit():
+    forced_size = int(cleaned)
 
 # Count non-empty lines
 lines = [t for t in [text1, text2, text3, text4] if t]
@@ -31,13 +28,13 @@ if forced_size:
     textSize = forced_size
 else:
     if line_count == 1:
-        textSize = 28   # Waveshare Font00 30–32 works perfectly
+        textSize = 28  # Waveshare Font00 30–32 works perfectly
     elif line_count == 2:
         textSize = 26
     elif line_count == 3:
         textSize = 22
     else:
-        textSize = 20   # fits 4 lines cleanly
+        textSize = 20  # fits 4 lines cleanly
 
 msg = f"{text1}|{text2}|{text3}|{text4}|{textSize}"
 
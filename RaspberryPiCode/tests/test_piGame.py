@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Engine move cache: what a hit does to the background (ponder) search.
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("chess")
+pytest.importorskip("serial")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "main"))
+
+import chess  # noqa: E402
+
+import piGame  # noqa: E402
+from piEngine import EngineContext  # noqa: E402
+
+
+class _Analysis:
+    """Stands in for chess.engine.SimpleAnalysisResult."""
+
+    def __init__(self):
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def wait(self):
+        return None
+
+
+def test_bestmove_cache_hit_stops_ponder():
+    piGame.reset_game_caches()
+    ctx = EngineContext()
+    board = chess.Board()
+    key = (board._transposition_key(), 5, 1000)
+
+    assert piGame.cached_engine_move(ctx, key, lambda: "e2e4") == "e2e4"
+
+    analysis = _Analysis()
+    ctx._ponder = analysis
+    ctx._ponder_board = board.copy()
+
+    def search():
+        raise AssertionError("a cache hit must not search")
+
+    assert piGame.cached_engine_move(ctx, key, search) == "e2e4"
+    assert analysis.stopped
+    assert ctx._ponder is None
+
+
+class _Display:
+    def flush_pending(self):
+        return None
+
+
+def test_search_leaves_no_stale_wake():
+    import pty
+    import time
+    import tty
+
+    from piSerial import BoardLink
+
+    pico, pi = pty.openpty()
+    tty.setraw(pico)
+    link = BoardLink(os.ttyname(pi), timeout=0.2)
+    try:
+        board = chess.Board()
+        for _ in range(200):
+            assert (
+                piGame.search_while_serving(link, _Display(), board, lambda: "e2e4")
+                == "e2e4"
+            )
+        # A leftover wake byte would end this wait immediately
+        t0 = time.monotonic()
+        assert link.wait_readable(0.1) is False
+        assert time.monotonic() - t0 >= 0.09
+    finally:
+        link.close()
+        os.close(pico)
+        os.close(pi)
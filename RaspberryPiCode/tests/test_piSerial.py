@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+BoardLink against a pseudo-terminal standing in for the Pico's UART.
+"""
+import os
+import pty
+import sys
+import time
+import tty
+
+import pytest
+
+pytest.importorskip("serial")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "main"))
+
+from piSerial import BoardLink  # noqa: E402
+
+
+@pytest.fixture
+def link_and_pico():
+    pico, pi = pty.openpty()
+    tty.setraw(pico)
+    link = BoardLink(os.ttyname(pi), timeout=0.2)
+    yield link, pico
+    link.close()
+    os.close(pico)
+    os.close(pi)
+
+
+def test_idle_reads_return_nothing(link_and_pico):
+    link, _ = link_and_pico
+    assert link.getboard_nonblocking() is None
+    assert link.drain_nonblocking() == []
+    assert link.getboard() is None  # serial timeout, no exception
+    assert link.wait_readable(0.05) is False
+
+
+def test_reads_after_idle(link_and_pico):
+    link, pico = link_and_pico
+    assert link.getboard_nonblocking() is None
+    os.write(pico, b"heypie2e4\nheypiok\n")
+    assert link.getboard(block=True) == "e2e4"
+    assert link.drain_nonblocking() == ["ok"]
+    assert link.getboard_nonblocking() is None
+
+
+def test_partial_line_waits_for_rest(link_and_pico):
+    link, pico = link_and_pico
+    os.write(pico, b"heypityping_")
+    assert link.getboard_nonblocking() is None
+    os.write(pico, b"e2\n")
+    assert link.getboard() == "typing_e2"
+
+
+def test_wake_cuts_wait_short_until_cleared(link_and_pico):
+    link, _ = link_and_pico
+    link.wake()
+    t0 = time.monotonic()
+    assert link.wait_readable(1.0) is False
+    assert time.monotonic() - t0 < 0.5
+
+    link.wake()
+    link.clear_wake()
+    t0 = time.monotonic()
+    assert link.wait_readable(0.1) is False
+    assert time.monotonic() - t0 >= 0.09